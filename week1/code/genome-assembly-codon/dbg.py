@@ -7,18 +7,72 @@ def reverse_complement(s: str) -> str:
         out.append(comp[ch] if ch in comp else ch)
     return ''.join(out)
 
+BASES: str = 'ACGT'
+MAX_PACKED_K: int = 31
+
+def base_to_bits(ch: str) -> int:
+    if ch == 'A':
+        return 0
+    if ch == 'C':
+        return 1
+    if ch == 'G':
+        return 2
+    if ch == 'T':
+        return 3
+    raise ValueError("invalid base: " + ch)
+
+def decode_kmer(code: int, k: int) -> str:
+    out: List[str] = [''] * k
+    for i in range(k - 1, -1, -1):
+        out[i] = BASES[code & 3]
+        code >>= 2
+    return ''.join(out)
+
+# 32 MB of bits; must stay a power of two for the position mask
+BLOOM_BITS: int = 1 << 28
+BLOOM_HASHES: int = 3
+
+class BloomFilter:
+    n_bits: int
+    n_hashes: int
+    words: List[int]
+
+    def __init__(self, n_bits: int = BLOOM_BITS, n_hashes: int = BLOOM_HASHES):
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.words = [0] * (n_bits >> 6)
+
+    def add(self, h: int) -> bool:
+        # sets the bits of hash h; True if they were all set already.
+        # Products wrap at 64 bits, the mask keeps positions non-negative.
+        h1 = h * 0x5851F42D4C957F2D
+        h2 = (h ^ (h >> 29)) * 0x14057B7EF767814F | 1
+        seen = True
+        for i in range(self.n_hashes):
+            pos = (h1 + i * h2) & (self.n_bits - 1)
+            bit = 1 << (pos & 63)
+            if not self.words[pos >> 6] & bit:
+                seen = False
+                self.words[pos >> 6] |= bit
+        return seen
+
 class Node:
     kmer: str
+    code: int
     children: Set[int]
+    parents: Set[int]
     count: int
     alive: bool
     visited: bool
     depth: int
     max_depth_child: Optional[int]
     
-    def __init__(self, kmer: str):
+    def __init__(self, kmer: str, code: int = -1):
+        # packed mode leaves kmer empty and keys the node by its 2-bit code
         self.kmer = kmer
+        self.code = code
         self.children = set()
+        self.parents = set()
         self.count = 0
         self.alive = True
         self.visited = False
@@ -27,23 +81,116 @@ class Node:
 
 class DBG:
     k: int
+    packed: bool
     nodes: List[Node]
     index: Dict[str, int]
+    pindex: Dict[int, int]
+    bloom: bool
+    seen: BloomFilter
 
-    def __init__(self, k: int, data_list: List[List[str]]):
+    def __init__(self, k: int, data_list: List[List[str]], packed: bool = False, bloom: bool = False):
         self.k = k
+        self.packed = packed
         self.nodes = []
         self.index = {}
+        self.pindex = {}
+        # bloom: only k-mers seen in at least two reads become nodes
+        self.bloom = bloom
+        self.seen = BloomFilter(BLOOM_BITS if bloom else 64)
+        if packed and k > MAX_PACKED_K:
+            raise ValueError("packed k-mers need k <= 31")
         self._build(data_list)
+        # the filter is only needed while building
+        self.seen = BloomFilter(64)
 
     def _build(self, data_list: List[List[str]]) -> None:
         for data in data_list:
             for original in data:
+                if self.packed:
+                    self._add_read_packed(original)
+                    continue
                 rc = reverse_complement(original)
-                # Exact match to original: range(len(original) - self.k - 1)
-                for i in range(len(original) - self.k - 1):
-                    self._add_arc(original[i:i+self.k], original[i+1:i+1+self.k])
-                    self._add_arc(rc[i:i+self.k], rc[i+1:i+1+self.k])
+                solid: Set[str] = set()
+                if self.bloom:
+                    kmers: List[str] = []
+                    for i in range(len(original) - self.k):
+                        kmers.append(original[i:i+self.k])
+                        kmers.append(rc[i:i+self.k])
+                    solid = self._solid_kmers(kmers)
+                # Exact match to original: arcs between the k-mers at
+                # 0 .. len(original) - self.k - 1; each one is sliced once and
+                # handed on as the start of the next arc
+                a = original[0:self.k]
+                a_rc = rc[0:self.k]
+                for i in range(1, len(original) - self.k):
+                    b = original[i:i+self.k]
+                    b_rc = rc[i:i+self.k]
+                    if not self.bloom or (a in solid and b in solid):
+                        self._add_arc(a, b)
+                    if not self.bloom or (a_rc in solid and b_rc in solid):
+                        self._add_arc(a_rc, b_rc)
+                    a = b
+                    a_rc = b_rc
+
+    def _solid_kmers(self, kmers: List[str]) -> Set[str]:
+        # first read holding a k-mer only marks the Bloom filter, later ones
+        # let it in; counts therefore skip that first read
+        checked: Set[str] = set()
+        solid: Set[str] = set()
+        for kmer in kmers:
+            if kmer in checked:
+                continue
+            checked.add(kmer)
+            if kmer in self.index or self.seen.add(hash(kmer)):
+                solid.add(kmer)
+        return solid
+
+    def _solid_codes(self, codes: List[int]) -> Set[int]:
+        checked: Set[int] = set()
+        solid: Set[int] = set()
+        for code in codes:
+            if code in checked:
+                continue
+            checked.add(code)
+            if code in self.pindex or self.seen.add(code):
+                solid.add(code)
+        return solid
+
+    def _add_read_packed(self, original: str) -> None:
+        # Roll 2-bit codes for both strands; rc[j] is the reverse complement
+        # of the forward k-mer at j, so arcs match the str path one for one.
+        k = self.k
+        mask = (1 << (2 * k)) - 1
+        shift = 2 * (k - 1)
+        fwd: List[int] = []
+        rc: List[int] = []
+        code = 0
+        rc_code = 0
+        for i in range(len(original)):
+            b = base_to_bits(original[i])
+            code = ((code << 2) | b) & mask
+            rc_code = (rc_code >> 2) | ((3 - b) << shift)
+            if i >= k - 1:
+                fwd.append(code)
+                rc.append(rc_code)
+        n = len(original) - k
+        solid: Set[int] = set()
+        if self.bloom:
+            # the k-mers the arcs below touch, as in the str path
+            solid = self._solid_codes(fwd[:n] + rc[1:])
+        for i in range(n - 1):
+            if not self.bloom or (fwd[i] in solid and fwd[i+1] in solid):
+                self._link(self._get_or_add_packed(fwd[i]), self._get_or_add_packed(fwd[i+1]))
+            if not self.bloom or (rc[n-i] in solid and rc[n-i-1] in solid):
+                self._link(self._get_or_add_packed(rc[n-i]), self._get_or_add_packed(rc[n-i-1]))
+
+    def _get_or_add_packed(self, code: int) -> int:
+        if code in self.pindex:
+            return self.pindex[code]
+        idx = len(self.nodes)
+        self.pindex[code] = idx
+        self.nodes.append(Node("", code))
+        return idx
 
     def _get_or_add(self, kmer: str) -> int:
         if kmer in self.index:
@@ -54,12 +201,14 @@ class DBG:
         return idx
 
     def _add_arc(self, kmer1: str, kmer2: str) -> None:
-        idx1 = self._get_or_add(kmer1)
-        idx2 = self._get_or_add(kmer2)
+        self._link(self._get_or_add(kmer1), self._get_or_add(kmer2))
+
+    def _link(self, idx1: int, idx2: int) -> None:
         self.nodes[idx1].count += 1
         self.nodes[idx2].count += 1
         if idx1 != idx2:
             self.nodes[idx1].children.add(idx2)
+            self.nodes[idx2].parents.add(idx1)
 
     def _reset(self) -> None:
         for node in self.nodes:
@@ -146,6 +295,11 @@ class DBG:
     def _concat_path(self, path: List[int]) -> str:
         if not path:
             return ""
+        if self.packed:
+            s = decode_kmer(self.nodes[path[0]].code, self.k)
+            for nid in path[1:]:
+                s += BASES[self.nodes[nid].code & 3]
+            return s
         s = self.nodes[path[0]].kmer
         for nid in path[1:]:
             s += self.nodes[nid].kmer[-1]
@@ -155,12 +309,21 @@ class DBG:
         dead = set(path)
         for idx in path:
             node = self.nodes[idx]
-            if node.kmer in self.index:
+            if self.packed:
+                if node.code in self.pindex:
+                    del self.pindex[node.code]
+            elif node.kmer in self.index:
                 del self.index[node.kmer]
             node.alive = False
-        for n in self.nodes:
-            if n.alive and n.children:
-                n.children = n.children - dead
+        # only the in- and out-neighbours of dead nodes hold edges to them
+        for idx in dead:
+            node = self.nodes[idx]
+            for p in node.parents:
+                if self.nodes[p].alive:
+                    self.nodes[p].children.discard(idx)
+            for c in node.children:
+                if self.nodes[c].alive:
+                    self.nodes[c].parents.discard(idx)
 
     def get_longest_contig(self) -> Optional[str]:
         self._reset()
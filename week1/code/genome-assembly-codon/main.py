@@ -7,14 +7,16 @@ def main() -> None:
     print("DEBUG: main start"); 
     argv: List[str] = sys.argv
     if len(argv) < 2:
-        print("Usage: codon run main.py <data_dir>")
+        print("Usage: codon run main.py <data_dir> [--packed] [--bloom]")
         sys.exit(1)
 
     data_dir: str = argv[1]
+    packed: bool = "--packed" in argv[2:]
+    bloom: bool = "--bloom" in argv[2:]
     short1, short2, long1 = read_data(data_dir)
 
     k: int = 25  # same k as Python
-    dbg: DBG = DBG(k=k, data_list=[short1, short2, long1])
+    dbg: DBG = DBG(k=k, data_list=[short1, short2, long1], packed=packed, bloom=bloom)
 
     # === DEBUG: quick graph stats ===
     # node_count = len(dbg.nodes)
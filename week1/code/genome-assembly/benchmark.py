@@ -0,0 +1,173 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+from utils import find_file, iter_reads, n50
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_BASE = os.path.join(HERE, '..', '..', 'data')
+CODON_DIR = os.path.join(HERE, '..', 'genome-assembly-codon')
+DATASETS = ('data1', 'data2', 'data3', 'data4')
+# Python backends of the shared DBG engine (dbg.BACKENDS), then the codon port
+VARIANTS = ('str', 'packed', 'csr', 'codon')
+READ_FILES = ('short_1.fasta', 'short_2.fasta', 'long.fasta')
+
+
+def _peak_rss_kb(usage):
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+
+def _contig_stats(contigs):
+    lengths = [len(c) for c in contigs]
+    return {'contigs': len(lengths), 'total_length': sum(lengths), 'n50': n50(lengths)}
+
+
+def run_python(variant, data_dir, n_contigs, options):
+    # one measured run inside this process; the caller starts a fresh
+    # interpreter per run so peak RSS is not shared between runs
+    from dbg import BACKENDS, DBG
+
+    start = time.perf_counter()
+    data_list = []
+    for name in READ_FILES:
+        file_path = find_file(data_dir, name)
+        if file_path is not None:
+            data_list.append(list(iter_reads(file_path)))
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dbg = DBG(25, data_list, **dict(BACKENDS[variant], **options))
+    build = time.perf_counter() - start
+
+    contigs, times = [], []
+    for _ in range(n_contigs):
+        start = time.perf_counter()
+        c = dbg.get_longest_contig()
+        times.append(time.perf_counter() - start)
+        if c is None:
+            break
+        contigs.append(c)
+    result = {'phases': {'parse': parse, 'build': build, 'contigs': sum(times)}, 'contig_times': times}
+    result.update(_contig_stats(contigs))
+    result['peak_rss_kb'] = _peak_rss_kb(resource.getrusage(resource.RUSAGE_SELF))
+    return result
+
+
+def run_codon(data_dir):
+    # codon has no phase hooks: wall time and peak RSS of the whole run
+    if shutil.which('codon') is None:
+        return {'skipped': 'codon not found'}
+    out_path = os.path.join(data_dir, 'contig.fasta')
+    start = time.perf_counter()
+    proc = subprocess.Popen(['codon', 'run', '-release', 'main.py', data_dir], cwd=CODON_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    status = os.waitstatus_to_exitcode(status)
+    result = {'phases': {'total': time.perf_counter() - start}, 'peak_rss_kb': _peak_rss_kb(usage)}
+    if status != 0 or not os.path.exists(out_path):
+        result['error'] = 'exit status %d' % status
+        return result
+    result.update(_contig_stats(list(iter_reads(out_path))))
+    os.remove(out_path)
+    return result
+
+
+def run(variant, dataset, data_base, n_contigs, options):
+    data_dir = os.path.abspath(os.path.join(data_base, dataset))
+    if not os.path.isdir(data_dir):
+        return {'skipped': 'no data'}
+    if variant == 'codon':
+        return run_codon(data_dir)
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', variant, data_dir,
+           '--contigs', str(n_contigs), '--options', ','.join(options)]
+    proc = subprocess.run(cmd, cwd=HERE, stdout=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        return {'error': 'exit status %d' % proc.returncode}
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def compare(old_path, new_path):
+    # phase times and peak RSS of the new report relative to the old one
+    with open(old_path) as f:
+        old = {(r['dataset'], r['variant']): r for r in json.load(f)['runs']}
+    with open(new_path) as f:
+        new = json.load(f)['runs']
+    for run_new in new:
+        run_old = old.get((run_new['dataset'], run_new['variant']))
+        if run_old is None or 'phases' not in run_old or 'phases' not in run_new:
+            continue
+        cells = []
+        for phase, seconds in run_new['phases'].items():
+            if phase in run_old['phases']:
+                cells.append('%s %.2fs (%+.0f%%)' % (phase, seconds,
+                                                      100 * (seconds / max(run_old['phases'][phase], 1e-9) - 1)))
+        cells.append('rss %d KB (%+.0f%%)' % (run_new['peak_rss_kb'],
+                                               100 * (run_new['peak_rss_kb'] / max(run_old['peak_rss_kb'], 1) - 1)))
+        print(run_new['dataset'], run_new['variant'], ', '.join(cells))
+
+
+def _summary(result):
+    if 'phases' not in result:
+        return result.get('skipped') or result.get('error')
+    cells = ['%s %.2fs' % (phase, seconds) for phase, seconds in result['phases'].items()]
+    cells.append('rss %d KB' % result['peak_rss_kb'])
+    if 'n50' in result:
+        cells.append('N50 %s' % result['n50'])
+    return ', '.join(cells)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='time the week1 assemblers per phase and write JSON')
+    parser.add_argument('--datasets', nargs='+', default=list(DATASETS))
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS), choices=VARIANTS)
+    parser.add_argument('--data-base', default=DATA_BASE, help='directory holding data1..data4')
+    parser.add_argument('--contigs', type=int, default=20, help='contigs to extract per run')
+    parser.add_argument('--options', default='', help='extra DBG flags for the Python variants, e.g. canonical,compact')
+    parser.add_argument('--out', default='benchmark.json', help='JSON report path')
+    parser.add_argument('--compare', metavar='OLD_JSON', help='print changes against an earlier report')
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'DATA_DIR'), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    options = [option for option in args.options.split(',') if option]
+    if args.child:
+        variant, data_dir = args.child
+        print(json.dumps(run_python(variant, data_dir, args.contigs, {option: True for option in options})))
+        sys.exit(0)
+
+    report = {
+        'commit': _git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'options': options,
+        'runs': [],
+    }
+    for dataset in args.datasets:
+        for variant in args.variants:
+            result = run(variant, dataset, args.data_base, args.contigs, options)
+            result.update({'dataset': dataset, 'variant': variant})
+            report['runs'].append(result)
+            print(dataset, variant, _summary(result))
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    if args.compare:
+        compare(args.compare, args.out)
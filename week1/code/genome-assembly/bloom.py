@@ -0,0 +1,30 @@
+MASK64 = (1 << 64) - 1
+# 32 MB of bits and 3 hashes: about 0.1% false positives at 10M distinct k-mers,
+# 1% at ~22M and 2.3% at 30M
+BLOOM_BITS = 1 << 28
+BLOOM_HASHES = 3
+
+
+class BloomFilter:
+    def __init__(self, n_bits=BLOOM_BITS, n_hashes=BLOOM_HASHES):
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.bits = bytearray((n_bits + 7) >> 3)
+
+    def _positions(self, key):
+        # double hashing over two mixes of the builtin hash
+        h = hash(key) & MASK64
+        h1 = h * 0x9E3779B97F4A7C15 & MASK64
+        h2 = (h ^ h >> 29) * 0xBF58476D1CE4E5B9 & MASK64 | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key):
+        # sets the bits of key; True if they were all set already, i.e. key
+        # was (probably) added before
+        seen = True
+        for pos in self._positions(key):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & bit:
+                seen = False
+                self.bits[byte] |= bit
+        return seen
@@ -0,0 +1,242 @@
+import mmap
+import struct
+from array import array
+
+MAGIC = b'DBGSNAP1'
+# magic, then k, flags, nodes, child shift, targets, parent targets, k-mer bytes
+HEADER = struct.Struct('<8s7q')
+# INT_KMERS: the k-mer column holds 2-bit codes rather than strings
+PACKED, CANONICAL, COMPACTED, INT_KMERS = 1, 2, 4, 8
+# bits kept for an edge target below its source in CSRBuilder's edge keys;
+# canonical targets carry two strand bits, so ids stay below 2^34
+TARGET_BITS = 36
+
+
+class CSRGraph:
+    # Frozen node store with the same calls as dbg.NodeStore: per-node columns
+    # in typed arrays and edges in compressed sparse row form. Deleting a node
+    # only clears its alive flag. A serial build fills it through CSRBuilder;
+    # compacted and external graphs are frozen from their NodeStore.
+    def __init__(self, nodes, n, child_shift, packed=False):
+        # child_shift: bits to drop from a child entry to get its node id
+        self.child_shift = child_shift
+        self.count = array('d', bytes(8 * n))
+        self.size = array('q', bytes(8 * n))
+        self.kmer = array('Q', bytes(8 * n)) if packed else [None] * n
+        self.alive = bytearray(n)
+        self.offsets = array('q', bytes(8 * (n + 1)))
+        self.targets = array('q')
+        self.parent_offsets = array('q', bytes(8 * (n + 1)))
+        self.parent_targets = array('q')
+        # pop as we go so the Node objects are freed while the arrays fill up
+        for idx in range(n):
+            node = nodes.pop(idx, None)
+            if node is not None:
+                self.alive[idx] = 1
+                self.count[idx] = node.get_count()
+                self.size[idx] = node.size
+                self.kmer[idx] = node.kmer
+                self.targets.extend(node.get_children())
+                self.parent_targets.extend(node.get_parents())
+            self.offsets[idx + 1] = len(self.targets)
+            self.parent_offsets[idx + 1] = len(self.parent_targets)
+
+    @classmethod
+    def from_columns(cls, kmer, count, offsets, targets, parent_offsets, parent_targets, child_shift):
+        # every node alive and standing for one k-mer
+        graph = cls.__new__(cls)
+        n = len(count)
+        graph.child_shift = child_shift
+        graph.count = count
+        graph.size = array('q', [1]) * n
+        graph.kmer = kmer
+        graph.alive = bytearray(b'\x01') * n
+        graph.offsets = offsets
+        graph.targets = targets
+        graph.parent_offsets = parent_offsets
+        graph.parent_targets = parent_targets
+        return graph
+
+    def __len__(self):
+        return sum(self.alive)
+
+    def __contains__(self, idx):
+        return self.alive[idx] == 1
+
+    def ids(self):
+        alive = self.alive
+        return [idx for idx in range(len(alive)) if alive[idx]]
+
+    def get_children(self, idx):
+        alive, shift = self.alive, self.child_shift
+        children = self.targets[self.offsets[idx]: self.offsets[idx + 1]].tolist()
+        if len(children) == 1:
+            return children if alive[children[0] >> shift] else []
+        return [child for child in children if alive[child >> shift]]
+
+    def get_parents(self, idx):
+        alive = self.alive
+        return [parent for parent in self.parent_targets[self.parent_offsets[idx]: self.parent_offsets[idx + 1]]
+                if alive[parent]]
+
+    def get_count(self, idx):
+        return self.count[idx]
+
+    def get_size(self, idx):
+        return self.size[idx]
+
+    def get_kmer(self, idx):
+        return self.kmer[idx]
+
+    def delete(self, idx):
+        # edges into dead nodes are filtered out on read
+        self.alive[idx] = 0
+
+    def save(self, path, k, flags):
+        # fixed header, then every column as raw native-endian bytes, 8-byte
+        # columns first so each one stays aligned for the memoryview casts
+        int_kmers = isinstance(self.kmer, (array, memoryview))
+        n = len(self.alive)
+        if int_kmers:
+            kmer_offsets, blob = self.kmer, b''
+        else:
+            kmer_offsets, parts, offset = array('q', [0]), [], 0
+            for kmer in self.kmer:
+                data = kmer.encode() if kmer is not None else b''
+                parts.append(data)
+                offset += len(data)
+                kmer_offsets.append(offset)
+            blob = b''.join(parts)
+        flags |= INT_KMERS if int_kmers else 0
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, k, flags, n, self.child_shift, len(self.targets),
+                                len(self.parent_targets), len(blob)))
+            for column in (self.count, self.size, self.offsets, self.targets, self.parent_offsets,
+                           self.parent_targets, kmer_offsets, self.alive):
+                f.write(column)
+            f.write(blob)
+
+    @classmethod
+    def load(cls, path):
+        # map the file copy-on-write and cast views over it: nothing is parsed,
+        # and deletions only touch private copies of the alive pages
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, k, flags, n, child_shift, n_targets, n_parent_targets, n_blob = HEADER.unpack_from(mm)
+        assert magic == MAGIC, 'not a DBG snapshot: %s' % path
+        view = memoryview(mm)
+        pos = HEADER.size
+
+        def column(fmt, length, width=8):
+            nonlocal pos
+            col = view[pos: pos + length * width].cast(fmt)
+            pos += length * width
+            return col
+
+        graph = cls.__new__(cls)
+        graph._mmap = mm
+        graph.child_shift = child_shift
+        graph.count = column('d', n)
+        graph.size = column('q', n)
+        graph.offsets = column('q', n + 1)
+        graph.targets = column('q', n_targets)
+        graph.parent_offsets = column('q', n + 1)
+        graph.parent_targets = column('q', n_parent_targets)
+        kmer_column = column('Q' if flags & INT_KMERS else 'q', n if flags & INT_KMERS else n + 1)
+        graph.alive = column('B', n, 1)
+        graph.kmer = kmer_column if flags & INT_KMERS else _Strings(kmer_column, column('B', n_blob, 1))
+        return graph, k, flags
+
+
+class _Strings:
+    # read-only list of str over one byte blob and its offsets
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, idx):
+        return bytes(self.blob[self.offsets[idx]: self.offsets[idx + 1]]).decode()
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self.offsets) - 1))
+
+
+class CSRBuilder:
+    # Counts k-mers straight into columns while the reads stream by: ids come
+    # from kmer2idx, counts go into an array and each distinct edge is kept
+    # once in two id arrays. graph() sorts the edges into a CSRGraph, so no
+    # per-node object is made at any point of the build.
+    def __init__(self, kmer2idx, canonical, packed=False):
+        self.kmer2idx = kmer2idx
+        self.canonical = canonical
+        self.kmer = array('Q') if packed else []
+        self.count = array('d')
+        self.sources = array('q')
+        self.targets = array('q')
+        # source << TARGET_BITS | target of every edge so far
+        self._edges = set()
+
+    def add_node(self, kmer):
+        idx = self.kmer2idx.get(kmer)
+        if idx is None:
+            idx = self.kmer2idx[kmer] = len(self.count)
+            self.kmer.append(kmer)
+            self.count.append(1)
+        else:
+            self.count[idx] += 1
+        return idx
+
+    def add_edge(self, source, target):
+        edges = self._edges
+        n_edges = len(edges)
+        edges.add(source << TARGET_BITS | target)
+        if len(edges) > n_edges:
+            self.sources.append(source)
+            self.targets.append(target)
+
+    def add_arc(self, kmer1, kmer2):
+        idx1 = self.add_node(kmer1)
+        self.add_edge(idx1, self.add_node(kmer2))
+
+    def add_bidirected_arc(self, end1, end2):
+        # stored on both ends, as dbg.DBG._add_bidirected_arc does
+        (kmer1, strand1), (kmer2, strand2) = end1, end2
+        idx1 = self.add_node(kmer1)
+        idx2 = self.add_node(kmer2)
+        self.add_edge(idx1, (idx2 << 1 | strand2) << 1 | strand1)
+        self.add_edge(idx2, (idx1 << 1 | 1 - strand1) << 1 | 1 - strand2)
+
+    def graph(self):
+        # the caller's kmer2idx is no longer needed, and neither is the edge
+        # set once the edges are grouped
+        self.kmer2idx = self._edges = None
+        n = len(self.count)
+        offsets, targets = group_edges(self.sources, self.targets, n)
+        if self.canonical:
+            parent_offsets, parent_targets = array('q', bytes(8 * (n + 1))), array('q')
+        else:
+            parent_offsets, parent_targets = group_edges(self.targets, self.sources, n)
+        self.sources = self.targets = None
+        return CSRGraph.from_columns(self.kmer, self.count, offsets, targets, parent_offsets, parent_targets,
+                                     2 if self.canonical else 0)
+
+
+def group_edges(keys, values, n):
+    # counting sort of values by key into CSR offsets over n rows. A row lists
+    # its values as a set built in first-seen order would, which is the order
+    # of a Node's child (or parent) set, so ties break as in a NodeStore build
+    offsets = array('q', bytes(8 * (n + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for idx in range(n):
+        offsets[idx + 1] += offsets[idx]
+    pos = offsets[:-1]
+    grouped = array('q', bytes(8 * len(values)))
+    for key, value in zip(keys, values):
+        grouped[pos[key]] = value
+        pos[key] += 1
+    for idx in range(n):
+        start, end = offsets[idx], offsets[idx + 1]
+        if end - start > 1:
+            grouped[start: end] = array('q', set(grouped[start: end]))
+    return offsets, grouped
@@ -1,6 +1,15 @@
 import copy
+import sys
+import tempfile
+import time
+from array import array
 from matplotlib import pyplot as plt
 
+import kmers
+from bloom import BloomFilter
+import telemetry
+from csr import CSRBuilder, CSRGraph, PACKED, CANONICAL, COMPACTED
+
 
 def reverse_complement(key):
     complement = {'A': 'T', 'T': 'A', 'G': 'C', 'C': 'G'}
@@ -11,25 +20,77 @@ def reverse_complement(key):
     return ''.join(key)
 
 
+def read_arcs(original, k, packed=False, canonical=False):
+    n = len(original) - k
+    if canonical:
+        # one pass over the forward strand; the rc strand is implied by the twin edge
+        prev = None
+        if packed:
+            # both codes rolled inline, the rc one entering from the high end
+            codes = kmers.read_codes(original)
+            mask, shift = (1 << (2 * k)) - 1, 2 * (k - 1)
+            code = rc_code = 0
+            for b in codes[:k - 1]:
+                code = (code << 2) | b
+                rc_code = (rc_code >> 2) | ((3 - b) << shift)
+            for b in codes[k - 1:]:
+                code = ((code << 2) | b) & mask
+                rc_code = (rc_code >> 2) | ((3 - b) << shift)
+                cur = (code, 0) if code <= rc_code else (rc_code, 1)
+                if prev is not None:
+                    yield prev, cur
+                prev = cur
+        else:
+            rc_read = reverse_complement(original)
+            fwd = [original[i: i + k] for i in range(n + 1)]
+            rc = [rc_read[n - i: n - i + k] for i in range(n + 1)]
+            for i in range(n + 1):
+                cur = (fwd[i], 0) if fwd[i] <= rc[i] else (rc[i], 1)
+                if prev is not None:
+                    yield prev, cur
+                prev = cur
+    elif packed:
+        # the str path below with codes rolled over the read and its reverse
+        # complement instead of slices: same arcs in the same order
+        codes = kmers.read_codes(original)
+        rc_codes = codes[::-1].translate(kmers.COMPLEMENT_CODES)
+        mask = (1 << (2 * k)) - 1
+        prev = prev_rc = 0
+        for b, c in zip(codes[:k], rc_codes[:k]):
+            prev, prev_rc = (prev << 2) | b, (prev_rc << 2) | c
+        for b, c in zip(codes[k: n + k - 1], rc_codes[k: n + k - 1]):
+            cur, cur_rc = ((prev << 2) | b) & mask, ((prev_rc << 2) | c) & mask
+            yield prev, cur
+            yield prev_rc, cur_rc
+            prev, prev_rc = cur, cur_rc
+    else:
+        # each k-mer is sliced once and handed on as the start of the next arc
+        rc = reverse_complement(original)
+        prev, prev_rc = original[:k], rc[:k]
+        for i in range(1, n):
+            cur, cur_rc = original[i: i + k], rc[i: i + k]
+            yield prev, cur
+            yield prev_rc, cur_rc
+            prev, prev_rc = cur, cur_rc
+
+
 class Node:
+    __slots__ = ('_children', '_parents', '_count', 'kmer')
+    # number of k-mers the node stands for, see Unitig
+    size = 1
+
     def __init__(self, kmer):
         self._children = set()
+        # created on first add_parent; canonical graphs never need it
+        self._parents = None
         self._count = 0
         self.kmer = kmer
-        self.visited = False
-        self.depth = 0
-        self.max_depth_child = None
 
     def add_child(self, kmer):
         self._children.add(kmer)
 
-    def increase(self):
-        self._count += 1
-
-    def reset(self):
-        self.visited = False
-        self.depth = 0
-        self.max_depth_child = None
+    def increase(self, count=1):
+        self._count += count
 
     def get_count(self):
         return self._count
@@ -37,112 +98,822 @@ class Node:
     def get_children(self):
         return list(self._children)
 
-    def remove_children(self, target):
-        self._children = self._children - target
+    def remove_child(self, child):
+        self._children.discard(child)
+
+    def add_parent(self, kmer):
+        if self._parents is None:
+            self._parents = set()
+        self._parents.add(kmer)
+
+    def get_parents(self):
+        return list(self._parents) if self._parents else []
+
+    def remove_parent(self, parent):
+        if self._parents:
+            self._parents.discard(parent)
+
+
+class Unitig(Node):
+    __slots__ = ('size',)
+
+    def __init__(self, sequence, size, coverage):
+        super().__init__(sequence)
+        self.size = size
+        # mean k-mer count over the chain
+        self._count = coverage
+
+
+class NodeStore(dict):
+    # node id -> Node, the graph backend used while building. CSRGraph in
+    # csr.py answers the same calls from flat arrays; the DBG engine only
+    # talks to its store through them.
+    def __init__(self, canonical=False):
+        super().__init__()
+        self.canonical = canonical
+
+    def ids(self):
+        return list(self.keys())
+
+    def get_children(self, idx):
+        return self[idx].get_children()
+
+    def get_parents(self, idx):
+        return self[idx].get_parents()
+
+    def get_count(self, idx):
+        return self[idx].get_count()
+
+    def get_size(self, idx):
+        return self[idx].size
+
+    def get_kmer(self, idx):
+        return self[idx].kmer
+
+    def delete(self, idx):
+        node = self.pop(idx)
+        # only the in- and out-neighbours of a deleted node hold edges to it
+        if self.canonical:
+            # edges are stored on both ends, so the in-edges of a deleted
+            # node are the twins of its own out-edges
+            for edge in node.get_children():
+                strand, child = edge & 1, edge >> 1
+                if child >> 1 in self:
+                    twin = (idx << 1 | 1 - strand) << 1 | 1 - (child & 1)
+                    self[child >> 1].remove_child(twin)
+            return
+        for parent in node.get_parents():
+            if parent in self:
+                self[parent].remove_child(idx)
+        for child in node.get_children():
+            if child in self:
+                self[child].remove_parent(idx)
+
+
+# name -> DBG options, for choosing a backend from the command line
+BACKENDS = {
+    # str k-mer slices in Node objects
+    'str': {},
+    # 2-bit packed int k-mers in Node objects
+    'packed': {'packed': True},
+    # packed k-mers counted straight into flat arrays
+    'csr': {'packed': True, 'csr': True},
+}
 
 
 class DBG:
-    def __init__(self, k, data_list):
+    def __init__(self, k, data_list, packed=False, canonical=False, workers=1, compact=False,
+                 incremental=False, csr=False, prune=False, min_count=None, bloom=False, max_mem=None,
+                 telemetry=None):
+        self._init_state(k, packed, canonical, workers, bloom, max_mem, incremental, telemetry, csr)
+        # build
+        self._check(data_list)
+        self._phase('build', self._build, data_list)
+        if prune:
+            self._phase('prune', self._prune, min_count)
+        if compact:
+            self._phase('compact', self._compact)
+        # csr and parallel builds are already flat; compacted and external
+        # graphs are NodeStores that still need freezing
+        if csr and not isinstance(self.nodes, CSRGraph):
+            self._phase('freeze', self._freeze)
+
+    def _init_state(self, k, packed=False, canonical=False, workers=1, bloom=False, max_mem=None,
+                    incremental=False, telemetry=None, csr=False):
+        # options and the empty graph, traversal and telemetry state; shared
+        # by __init__ and load, so snapshots get every attribute a build has
         self.k = k
-        self.nodes = {}
+        # packed: k-mers are 2-bit encoded ints instead of str slices
+        self.packed = packed
+        # canonical: a k-mer and its reverse complement share one node, and
+        # traversal runs on vertices idx << 1 | strand over bidirected edges
+        self.canonical = canonical
+        self._strand_bits = 1 if canonical else 0
+        # workers > 1: build the graph in worker processes, see parallel.py
+        self.workers = workers
+        # bloom: only k-mers seen in at least two reads become nodes
+        self.bloom = bloom
+        # max_mem: memory budget in MB; k-mers are counted in on-disk buckets
+        # one at a time and the graph is built as unitigs, see external.py
+        self.max_mem = max_mem
+        # csr: nodes live in flat arrays, see csr.py; serial and parallel
+        # builds fill them directly, other graphs are frozen after the build
+        self.csr = csr
+        # compacted: nodes are Unitigs holding whole non-branching chains
+        self.compacted = False
+        # the graph backend: a NodeStore, or a CSRGraph once frozen
+        self.nodes = NodeStore(canonical)
         # private
         self.kmer2idx = {}
         self.kmer_count = 0
-        # build
-        self._check(data_list)
-        self._build(data_list)
+        # traversal state by vertex, see _reset; a depth of 0 is not known yet
+        # and a best child of -1 is none
+        self._depth = {}
+        self._max_depth_child = {}
+        # what a vertex adds to the depth of a path: its k-mers, or its k-mer
+        # counts when contigs are ranked by coverage, see iter_contigs
+        self._weight = self._get_size
+        # incremental: keep traversal state between contigs and only drop
+        # it for vertices that could reach the deleted path
+        self.incremental = incremental
+        # telemetry: a callback taking event dicts, or a Telemetry; defaults to
+        # the DBG_TELEMETRY environment variable, see telemetry.py
+        self._telemetry = self._make_telemetry(telemetry)
+        self._reads = 0
+        self._contigs = 0
+
+    @staticmethod
+    def _make_telemetry(sink):
+        if sink is None:
+            return telemetry.from_env()
+        if isinstance(sink, telemetry.Telemetry):
+            return sink
+        return telemetry.Telemetry(sink)
+
+    def _phase(self, name, step, *args):
+        # run one construction step, with a timing event when telemetry is on;
+        # a step may return a dict of its own stats for the event
+        if self._telemetry is None:
+            step(*args)
+            return
+        start = time.perf_counter()
+        stats = step(*args) or {}
+        self._telemetry.emit(name, seconds=round(time.perf_counter() - start, 3), reads=self._reads,
+                             nodes=len(self.nodes.ids()), edges=self._edge_count(),
+                             dict_bytes=sys.getsizeof(self.nodes) + sys.getsizeof(self.kmer2idx), **stats)
+
+    def _edge_count(self):
+        return sum(len(self.nodes.get_children(idx)) for idx in self.nodes.ids())
 
     def _check(self, data_list):
         # check data list
         assert len(data_list) > 0
-        assert self.k <= len(data_list[0][0])
+        if self.packed:
+            assert self.k <= kmers.MAX_PACKED_K
+        # the Bloom pass runs inside the serial build only
+        assert not (self.bloom and self.workers > 1)
+        assert not (self.max_mem and (self.bloom or self.workers > 1))
 
-    def _build(self, data_list):
+    def _iter_reads(self, data_list):
+        # data may be lists or lazy read streams, so check the first read here
+        first = True
+        start = time.perf_counter()
         for data in data_list:
             for original in data:
-                rc = reverse_complement(original)
-                for i in range(len(original) - self.k - 1):
-                    self._add_arc(original[i: i + self.k], original[i + 1: i + 1 + self.k])
-                    self._add_arc(rc[i: i + self.k], rc[i + 1: i + 1 + self.k])
+                if first:
+                    assert self.k <= len(original)
+                    first = False
+                self._reads += 1
+                if self._telemetry is not None and self._reads % telemetry.PROGRESS_EVERY == 0:
+                    seconds = time.perf_counter() - start
+                    self._telemetry.emit('build_progress', reads=self._reads,
+                                         reads_per_s=round(self._reads / seconds, 1), nodes=len(self.kmer2idx),
+                                         dict_bytes=sys.getsizeof(self.nodes) + sys.getsizeof(self.kmer2idx))
+                yield original
+
+    def _build(self, data_list):
+        if self.workers > 1:
+            self._build_parallel(data_list)
+            return
+        if self.max_mem:
+            self._build_external(data_list)
+            return
+        if self.csr:
+            self._build_columns(data_list)
+            return
+        self._build_arcs(data_list, self._add_bidirected_arc if self.canonical else self._add_arc)
+
+    def _build_arcs(self, data_list, add_arc):
+        if self.bloom:
+            self._build_solid(data_list, add_arc)
+            return
+        for original in self._iter_reads(data_list):
+            for kmer1, kmer2 in read_arcs(original, self.k, self.packed, self.canonical):
+                add_arc(kmer1, kmer2)
+
+    def _build_columns(self, data_list):
+        # the same arcs counted into columns, see csr.CSRBuilder, so the build
+        # makes no Node objects; the k-mer index goes before the edges are sorted
+        builder = CSRBuilder(self.kmer2idx, self.canonical, self.packed)
+        self._build_arcs(data_list, builder.add_bidirected_arc if self.canonical else builder.add_arc)
+        self.kmer2idx = {}
+        self.nodes = builder.graph()
+        self.kmer_count = len(self.nodes.alive)
+        self._reset()
+
+    def _build_solid(self, data_list, add_arc):
+        # two-stage counting: the first read holding a k-mer only sets its bits
+        # in a Bloom filter, and the node is made from the second one on, so
+        # error k-mers seen once never get a Node. Counts skip that first read.
+        seen = BloomFilter()
+        key = (lambda end: end[0]) if self.canonical else (lambda end: end)
+        for original in self._iter_reads(data_list):
+            arcs = list(read_arcs(original, self.k, self.packed, self.canonical))
+            solid = set()
+            for kmer in dict.fromkeys(key(end) for arc in arcs for end in arc):
+                if kmer in self.kmer2idx or seen.add(kmer):
+                    solid.add(kmer)
+            for end1, end2 in arcs:
+                if key(end1) in solid and key(end2) in solid:
+                    add_arc(end1, end2)
+
+    def _build_parallel(self, data_list):
+        # the graph comes back as a CSRGraph built shard by shard, see
+        # parallel.py; its node ids differ from a serial build's, so contigs
+        # can differ where paths tie
+        from parallel import build_csr
+
+        self.nodes = build_csr(self._iter_reads(data_list), self.k, self.packed, self.canonical, self.workers)
+        self.kmer_count = len(self.nodes.alive)
+        self._reset()
+
+    def _build_external(self, data_list):
+        # k-mers are split by minimizer into partitions on disk; each bucket of
+        # partitions is counted and compacted into unitigs on its own, and the
+        # unitigs are stitched together once every bucket is done
+        from external import group_partitions, iter_records, partition
+
+        budget = self.max_mem << 20
+        unitigs, head_of, links = NodeStore(self.canonical), {}, []
+        with tempfile.TemporaryDirectory(prefix='dbg-') as tmp_dir:
+            sizes = partition(self._iter_reads(data_list), self.k, self.packed, self.canonical, tmp_dir, budget)
+            for bucket, group in enumerate(group_partitions(sizes, budget)):
+                start = time.perf_counter()
+                self._build_bucket(iter_records(tmp_dir, group), iter_records(tmp_dir, group))
+                n_kmers, n_unitigs = len(self.nodes), len(unitigs)
+                # unitig ends are matched across buckets by k-mer (and strand)
+                ids = list(self.kmer2idx)
+                if self.canonical:
+                    key = lambda v: (ids[v >> 1], v & 1)
+                else:
+                    key = ids.__getitem__
+                self._cut_unitigs(unitigs, head_of, links, key)
+                if self._telemetry is not None:
+                    self._telemetry.emit('bucket', index=bucket, partitions=len(group), kmers=n_kmers,
+                                         unitigs=len(unitigs) - n_unitigs,
+                                         seconds=round(time.perf_counter() - start, 3))
+        self._link_unitigs(unitigs, head_of, links)
+        self.nodes = unitigs
+        self.kmer2idx = {}
+        self.kmer_count = len(unitigs)
+        self.compacted = True
+        # chains that ran across buckets
+        self._compact()
+
+    def _build_bucket(self, records, again):
+        # the graph of one bucket: its own k-mers get nodes first, k-mers of
+        # other buckets only get ids so that edges to them are kept
+        self.nodes = NodeStore(self.canonical)
+        self.kmer2idx = {}
+        self.kmer_count = 0
+        for kmer, _, _ in records:
+            self._add_node(kmer)
+        for kmer, child, parent in again:
+            node = self.nodes[self.kmer2idx[kmer]]
+            if self.canonical:
+                kmer2, strand2, strand1 = child
+                node.add_child((self._kmer_id(kmer2) << 1 | strand2) << 1 | strand1)
+            elif child is not None:
+                node.add_child(self._kmer_id(child))
+            else:
+                node.add_parent(self._kmer_id(parent))
+
+    def _kmer_id(self, kmer):
+        if kmer not in self.kmer2idx:
+            self.kmer2idx[kmer] = self.kmer_count
+            self.kmer_count += 1
+        return self.kmer2idx[kmer]
 
     def show_count_distribution(self):
-        count = [0] * 30
-        for idx in self.nodes:
-            count[self.nodes[idx].get_count()] += 1
+        hist = self._count_histogram()
+        count = [hist.get(c, 0) for c in range(30)]
         print(count[0:10])
         # plt.plot(count)
         # plt.show()
 
-    def _add_node(self, kmer):
+    def _count_histogram(self):
+        hist = {}
+        for idx in self.nodes.ids():
+            count = int(self._get_count(idx << self._strand_bits))
+            hist[count] = hist.get(count, 0) + 1
+        return hist
+
+    @staticmethod
+    def _auto_min_count(hist):
+        # every k-mer inside a read is counted as the end of two arcs, so the
+        # histogram alternates between odd and even counts; smooth it by pairs
+        # and cut at the first valley after the error peak
+        top = max(hist) if hist else 0
+        pairs = [hist.get(c, 0) + hist.get(c + 1, 0) for c in range(top + 2)]
+        for c in range(1, top + 1):
+            if pairs[c] <= pairs[c + 1]:
+                return c
+        return 1
+
+    def _prune(self, min_count=None):
+        # drop error branches before traversal: low-count forks first, then
+        # the tips and bubbles they leave behind; returns what was removed
+        if min_count is None:
+            min_count = self._auto_min_count(self._count_histogram())
+        # an error near a read end gives a tip, one in the middle a bubble;
+        # either spans at most k k-mers, so 2k leaves some slack
+        max_len = 2 * self.k
+        n_nodes = len(self.nodes)
+        weak = self._remove_weak_branches(min_count, max_len)
+        tips = self._remove_tips(max_len)
+        bubbles = self._remove_bubbles(max_len)
+        return {'min_count': min_count, 'weak_branches': weak, 'tips': tips, 'bubbles': bubbles,
+                'nodes_before': n_nodes}
+
+    def _remove_weak_branches(self, min_count, max_len):
+        # low coverage alone is not enough, thin stretches of the genome look
+        # the same; cut a short low-count branch only where a fork offers a
+        # much better covered alternative
+        removed = 0
+        for step, back in ((self._get_children, self._get_parents), (self._get_parents, self._get_children)):
+            for v in self._vertices():
+                if v >> self._strand_bits not in self.nodes:
+                    continue
+                branches = step(v)
+                if len(branches) < 2:
+                    continue
+                best = max(self._get_count(u) for u in branches)
+                for u in branches:
+                    # weak: under min_count and at most a quarter of the best branch
+                    if u >> self._strand_bits not in self.nodes:
+                        continue
+                    if self._get_count(u) >= min_count or self._get_count(u) * 4 > best:
+                        continue
+                    chain, _ = self._walk_unique(u, step, back, max_len)
+                    if self._chain_size(chain) <= max_len:
+                        self._delete_path(chain)
+                        removed += 1
+        return removed
+
+    def _walk_unique(self, v, step, back, max_len):
+        # extend a chain from v over vertices with one way in and one way out;
+        # returns the chain and the vertex it runs into, or None if it stops
+        # at a dead end or a fork or grows past max_len k-mers
+        chain, size = [v], self._get_size(v)
+        while size <= max_len:
+            nxt = step(chain[-1])
+            if len(nxt) != 1:
+                return chain, None
+            if len(back(nxt[0])) != 1:
+                return chain, nxt[0]
+            chain.append(nxt[0])
+            size += self._get_size(nxt[0])
+        return chain, None
+
+    def _chain_size(self, chain):
+        # k-mers on a chain; unitigs of a compacted graph hold several
+        return sum(self._get_size(v) for v in chain)
+
+    def _remove_tips(self, max_len):
+        removed = 0
+        # tips hanging off both ends: walk from sources, then from sinks backwards
+        for step, back in ((self._get_children, self._get_parents), (self._get_parents, self._get_children)):
+            for v in self._vertices():
+                if v >> self._strand_bits not in self.nodes or back(v):
+                    continue
+                chain, end = self._walk_unique(v, step, back, max_len)
+                if end is not None and self._chain_size(chain) < max_len:
+                    self._delete_path(chain)
+                    removed += 1
+        return removed
+
+    def _remove_bubbles(self, max_len):
+        removed = 0
+        for v in self._vertices():
+            if v >> self._strand_bits not in self.nodes:
+                continue
+            children = self._get_children(v)
+            if len(children) < 2:
+                continue
+            branches = {}
+            for child in children:
+                if len(self._get_parents(child)) != 1:
+                    continue
+                chain, end = self._walk_unique(child, self._get_children, self._get_parents, max_len)
+                if end is not None:
+                    branches.setdefault(end, []).append(chain)
+            # parallel branches from v to the same vertex: keep the best covered
+            for chains in branches.values():
+                if len(chains) < 2:
+                    continue
+                chains.sort(key=lambda chain: sum(self._get_count(u) for u in chain) / len(chain), reverse=True)
+                for chain in chains[1:]:
+                    self._delete_path(chain)
+                    removed += 1
+        return removed
+
+    def _add_node(self, kmer, count=1):
         if kmer not in self.kmer2idx:
             self.kmer2idx[kmer] = self.kmer_count
             self.nodes[self.kmer_count] = Node(kmer)
             self.kmer_count += 1
         idx = self.kmer2idx[kmer]
-        self.nodes[idx].increase()
+        self.nodes[idx].increase(count)
         return idx
 
     def _add_arc(self, kmer1, kmer2):
         idx1 = self._add_node(kmer1)
         idx2 = self._add_node(kmer2)
+        self._add_edge(idx1, idx2)
+
+    def _add_edge(self, idx1, idx2):
         self.nodes[idx1].add_child(idx2)
+        self.nodes[idx2].add_parent(idx1)
+
+    def _add_bidirected_arc(self, end1, end2):
+        # an edge (v1, s1) -> (v2, s2) is stored on v1 as (v2 << 1 | s2) << 1 | s1,
+        # and its twin (v2, !s2) -> (v1, !s1) is stored on v2 the same way
+        (kmer1, strand1), (kmer2, strand2) = end1, end2
+        idx1 = self._add_node(kmer1)
+        idx2 = self._add_node(kmer2)
+        self.nodes[idx1].add_child((idx2 << 1 | strand2) << 1 | strand1)
+        self.nodes[idx2].add_child((idx1 << 1 | 1 - strand1) << 1 | 1 - strand2)
+
+    def _freeze(self):
+        # edges of canonical nodes carry two strand bits below the node id
+        child_shift = 2 if self.canonical else 0
+        self.nodes = CSRGraph(self.nodes, self.kmer_count, child_shift, self.packed and not self.compacted)
+        # lookups by k-mer are only needed while building
+        self.kmer2idx = {}
+        self._reset()
+
+    def save(self, path):
+        # snapshot of the built graph; the node store is frozen first if needed
+        if not isinstance(self.nodes, CSRGraph):
+            self._freeze()
+        flags = (PACKED if self.packed else 0) | (CANONICAL if self.canonical else 0) | \
+            (COMPACTED if self.compacted else 0)
+        self.nodes.save(path, self.k, flags)
+
+    @classmethod
+    def load(cls, path, incremental=False):
+        # a DBG over a snapshot written by save, with no reads to parse
+        graph, k, flags = CSRGraph.load(path)
+        dbg = cls.__new__(cls)
+        dbg._init_state(k, bool(flags & PACKED), bool(flags & CANONICAL), incremental=incremental)
+        dbg.compacted = bool(flags & COMPACTED)
+        dbg.nodes = graph
+        dbg.kmer_count = len(graph.alive)
+        dbg._reset()
+        return dbg
+
+    def _vertices(self):
+        if not self.canonical:
+            return self.nodes.ids()
+        return [idx << 1 | strand for idx in self.nodes.ids() for strand in (0, 1)]
+
+    def _get_children(self, v):
+        children = self.nodes.get_children(v >> self._strand_bits)
+        if not self.canonical:
+            return children
+        strand = v & 1
+        return [edge >> 1 for edge in children if edge & 1 == strand]
+
+    def _get_parents(self, v):
+        if self.canonical:
+            # (p, s) -> v exists iff its twin v' -> (p, !s) does
+            return [child ^ 1 for child in self._get_children(v ^ 1)]
+        return self.nodes.get_parents(v)
+
+    def _get_kmer(self, v):
+        # k-mer of a vertex, or the whole sequence of a unitig
+        kmer = self.nodes.get_kmer(v >> self._strand_bits)
+        if self.packed and not self.compacted:
+            kmer = kmers.decode(kmer, self.k)
+        if self.canonical and v & 1:
+            kmer = reverse_complement(kmer)
+        return kmer
 
     def _get_count(self, child):
-        return self.nodes[child].get_count()
+        return self.nodes.get_count(child >> self._strand_bits)
+
+    def _get_size(self, v):
+        return self.nodes.get_size(v >> self._strand_bits)
+
+    def _get_mass(self, v):
+        # count summed over the k-mers of a vertex
+        return self._get_count(v) * self._get_size(v)
 
     def _get_sorted_children(self, idx):
-        children = self.nodes[idx].get_children()
-        children.sort(key=self._get_count, reverse=True)
+        children = self._get_children(idx)
+        if len(children) > 1:
+            children.sort(key=self._get_count, reverse=True)
         return children
 
-    def _get_depth(self, idx):
-        if not self.nodes[idx].visited:
-            self.nodes[idx].visited = True
-            children = self._get_sorted_children(idx)
-            max_depth, max_child = 0, None
-            for child in children:
-                depth = self._get_depth(child)
-                if depth > max_depth:
-                    max_depth, max_child = depth, child
-            self.nodes[idx].depth, self.nodes[idx].max_depth_child = max_depth + 1, max_child
-        return self.nodes[idx].depth
+    def _get_depth(self, root):
+        # iterative DFS that settles a vertex when it is popped and all of its
+        # children are final. Tarjan bookkeeping rides along: an edge to a
+        # vertex still on the stack (a back edge) lowers the frame's low link,
+        # and only components closed that way go through _settle
+        depth, max_depth_child = self._depth, self._max_depth_child
+        known_depth = self._known_depth()
+        if known_depth(root):
+            return depth[root]
+        weight = self._weight
+        if self.canonical:
+            children_of, count_of = self._get_children, self._get_count
+        else:
+            # vertices are node ids, no strand to decode
+            children_of, count_of = self.nodes.get_children, self.nodes.get_count
+            if weight == self._get_size:
+                weight = self.nodes.get_size
+
+        index = {root: 0}
+        stack = [root]
+        children = children_of(root)
+        children.sort(key=count_of, reverse=True)
+        # frames: vertex, pending children, low link, best depth, best child
+        work = [[root, iter(children), 0, 0, -1]]
+        while work:
+            frame = work[-1]
+            for child in frame[1]:
+                known = known_depth(child)
+                if known:
+                    if known > frame[3]:
+                        frame[3], frame[4] = known, child
+                elif child in index:
+                    # on the stack: grey, or in a component not closed yet
+                    frame[2] = min(frame[2], index[child])
+                else:
+                    index[child] = low = len(index)
+                    stack.append(child)
+                    children = children_of(child)
+                    if len(children) > 1:
+                        children.sort(key=count_of, reverse=True)
+                    work.append([child, iter(children), low, 0, -1])
+                    break
+            else:
+                work.pop()
+                v, _, low, max_depth, max_child = frame
+                if low < index[v]:
+                    # on a cycle through an ancestor, settled with its component
+                    work[-1][2] = min(work[-1][2], low)
+                    continue
+                if stack[-1] == v:
+                    # no edge led back into v: its own component, no cycle
+                    stack.pop()
+                    known = depth[v] = max_depth + weight(v)
+                    max_depth_child[v] = max_child
+                else:
+                    while stack.pop() != v:
+                        pass
+                    self._settle(v)
+                    known = depth[v]
+                if work and known > work[-1][3]:
+                    work[-1][3], work[-1][4] = known, v
+        return depth[root]
+
+    def _settle(self, root):
+        # longest paths of one cyclic component: a DFS from its root drops the
+        # edges back onto its own path, which leaves a DAG
+        known_depth = self._known_depth()
+        best = {root: (0, -1)}
+        work = [(root, iter(self._get_sorted_children(root)))]
+        while work:
+            v, pending = work[-1]
+            for child in pending:
+                if known_depth(child):
+                    if self._depth[child] > best[v][0]:
+                        best[v] = (self._depth[child], child)
+                elif child not in best:
+                    best[child] = (0, -1)
+                    work.append((child, iter(self._get_sorted_children(child))))
+                    break
+                # else: edge back onto the DFS path, dropped to break the cycle
+            else:
+                work.pop()
+                max_depth, max_child = best[v]
+                self._depth[v], self._max_depth_child[v] = max_depth + self._weight(v), max_child
+                if work:
+                    parent = work[-1][0]
+                    if self._depth[v] > best[parent][0]:
+                        best[parent] = (self._depth[v], v)
 
     def _reset(self):
-        for idx in self.nodes.keys():
-            self.nodes[idx].reset()
+        if isinstance(self.nodes, CSRGraph):
+            # a frozen graph keeps its vertex ids, so the state fits in typed
+            # columns next to the graph's own
+            n = len(self.nodes.alive) << self._strand_bits
+            self._depth = array('d', bytes(8 * n))
+            self._max_depth_child = array('q', [-1]) * n
+        else:
+            self._depth = {}
+            self._max_depth_child = {}
+
+    def _known_depth(self):
+        # vertex -> its depth, or a false value if it has none yet
+        if isinstance(self._depth, dict):
+            return self._depth.get
+        return self._depth.__getitem__
+
+    def _visited(self):
+        if isinstance(self._depth, dict):
+            return len(self._depth)
+        return len(self._depth) - self._depth.count(0)
 
     def _get_longest_path(self):
-        max_depth, max_idx = 0, None
-        for idx in self.nodes.keys():
-            depth = self._get_depth(idx)
+        max_depth, max_idx = 0, -1
+        known_depth = self._known_depth()
+        for idx in self._vertices():
+            depth = known_depth(idx) or self._get_depth(idx)
             if depth > max_depth:
                 max_depth, max_idx = depth, idx
 
         path = []
-        while max_idx is not None:
+        while max_idx >= 0:
             path.append(max_idx)
-            max_idx = self.nodes[max_idx].max_depth_child
+            max_idx = self._max_depth_child[max_idx]
         return path
 
+    def _invalidate(self, path):
+        # drop cached depth of the path and of every vertex that can reach it
+        stack = list(path)
+        if self.canonical:
+            stack += [v ^ 1 for v in path]
+        seen = set(stack)
+        while stack:
+            v = stack.pop()
+            if isinstance(self._depth, dict):
+                self._depth.pop(v, None)
+                self._max_depth_child.pop(v, None)
+            else:
+                self._depth[v] = 0
+            for parent in self._get_parents(v):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+
     def _delete_path(self, path):
-        for idx in path:
-            del self.nodes[idx]
-        path_set = set(path)
-        for idx in self.nodes.keys():
-            self.nodes[idx].remove_children(path_set)
+        # pruning may hand over chains that share nodes already gone
+        for idx in dict.fromkeys(v >> self._strand_bits for v in path):
+            if idx in self.nodes:
+                self.nodes.delete(idx)
 
     def _concat_path(self, path):
         if len(path) < 1:
             return None
-        concat = copy.copy(self.nodes[path[0]].kmer)
+        concat = copy.copy(self._get_kmer(path[0]))
         for i in range(1, len(path)):
-            concat += self.nodes[path[i]].kmer[-1]
+            concat += self._get_kmer(path[i])[self.k - 1:]
         return concat
 
-    def get_longest_contig(self):
-        # reset params in nodes for getting longest path
+    def _chains(self):
+        # non-branching chains of vertices, and the out-edges they were cut
+        # from; in a bucket of the external build, children outside the
+        # bucket end a chain like a fork does
+        bits = self._strand_bits
+        children = {v: self._get_children(v) for v in self._vertices()}
+        in_degree = {v: len(self._get_parents(v)) for v in children}
+        # vertices whose only predecessor has no other child
+        chained = {children[v][0] for v in children if len(children[v]) == 1 and children[v][0] != v}
+
+        used = set()
+
+        def walk(head):
+            chain, cur = [head], head
+            used.add(head >> bits)
+            while len(children[cur]) == 1:
+                nxt = children[cur][0]
+                if nxt not in children or in_degree[nxt] != 1 or nxt >> bits in used:
+                    break
+                chain.append(nxt)
+                used.add(nxt >> bits)
+                cur = nxt
+            return chain
+
+        chains = []
+        for v in children:
+            if v >> bits not in used and not (in_degree[v] == 1 and v in chained):
+                chains.append(walk(v))
+        # whatever is left sits on isolated cycles
+        for v in children:
+            if v >> bits not in used:
+                chains.append(walk(v))
+        return chains, children
+
+    def _cut_unitigs(self, nodes, head_of, links, key=None):
+        # add a Unitig to nodes per chain of the current graph. head_of maps
+        # key(vertex) of chain heads to unitig vertices, links collects the
+        # (unitig, strand, key(child)) out-edges for _link_unitigs
+        bits = self._strand_bits
+        chains, children = self._chains()
+        for chain in chains:
+            uid = len(nodes)
+            # counts are weighted by the k-mers each vertex stands for
+            size = sum(self._get_size(v) for v in chain)
+            coverage = sum(self._get_mass(v) for v in chain) / size
+            nodes[uid] = Unitig(self._concat_path(chain), size, coverage)
+            head_of[key(chain[0]) if key else chain[0]] = uid << bits
+            # out-edges of the unitig, and of its reverse complement when canonical
+            tails = [(0, chain[-1])]
+            if self.canonical:
+                head_of[key(chain[-1] ^ 1) if key else chain[-1] ^ 1] = uid << 1 | 1
+                tails.append((1, chain[0] ^ 1))
+            for strand, tail in tails:
+                for child in children[tail]:
+                    links.append((uid, strand, key(child) if key else child))
+
+    def _link_unitigs(self, nodes, head_of, links):
+        for uid, strand, child in links:
+            if child not in head_of:
+                continue
+            if self.canonical:
+                nodes[uid].add_child(head_of[child] << 1 | strand)
+            else:
+                nodes[uid].add_child(head_of[child])
+                nodes[head_of[child]].add_parent(uid)
+
+    def _compact(self):
+        # collapse every non-branching chain of vertices into one Unitig node
+        nodes, head_of, links = NodeStore(self.canonical), {}, []
+        self._cut_unitigs(nodes, head_of, links)
+        self._link_unitigs(nodes, head_of, links)
+        self.nodes = nodes
+        # k-mer ids no longer exist once chains are merged
+        self.kmer2idx = {}
+        self.kmer_count = len(nodes)
+        self.compacted = True
         self._reset()
+
+    def _use_weight(self, weight):
+        # depths under another weight are meaningless, drop them
+        if weight != self._weight:
+            self._weight = weight
+            self._reset()
+
+    def _extract(self):
+        # the deepest path under the current weight, taken out of the graph;
+        # returns the contig and its mean k-mer coverage
+        start = time.perf_counter()
+        # reset traversal state for getting longest path
+        if not self.incremental:
+            self._reset()
         path = self._get_longest_path()
         contig = self._concat_path(path)
+        coverage = sum(self._get_mass(v) for v in path) / self._chain_size(path) if path else 0
+        if self.incremental:
+            self._invalidate(path)
         self._delete_path(path)
+        if self._telemetry is not None:
+            self._telemetry.emit('contig', index=self._contigs, length=len(contig) if contig else 0,
+                                 coverage=round(coverage, 2), path=len(path),
+                                 seconds=round(time.perf_counter() - start, 3),
+                                 nodes=len(self.nodes.ids()), visited=self._visited())
+        self._contigs += 1
+        return contig, coverage
+
+    def get_longest_contig(self):
+        self._use_weight(self._get_size)
+        contig, _ = self._extract()
         return contig
+
+    def iter_contigs(self, by_coverage=False, min_length=0, min_coverage=0, target_length=None):
+        # contigs best first, extracted one at a time as the caller asks.
+        # by_coverage ranks paths by length x mean coverage instead of length.
+        # Contigs under min_length or min_coverage are dropped, and the walk
+        # ends once target_length bases have been yielded. Removing a path
+        # never raises the score of another, and every k-mer is counted at
+        # least once, so as soon as the best score is below min_length
+        # (times min_coverage) no later contig can pass and nothing is left
+        # to traverse for
+        self._use_weight(self._get_mass if by_coverage else self._get_size)
+        floor = max(min_length - self.k + 1, 0)
+        if by_coverage:
+            floor *= max(min_coverage, 1)
+        total = 0
+        while target_length is None or total < target_length:
+            contig, coverage = self._extract()
+            if contig is None:
+                return
+            score = (len(contig) - self.k + 1) * (coverage if by_coverage else 1)
+            if score < floor:
+                return
+            if len(contig) < min_length or coverage < min_coverage:
+                continue
+            total += len(contig)
+            yield contig
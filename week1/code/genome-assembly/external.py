@@ -0,0 +1,106 @@
+import os
+import pickle
+
+import kmers
+from dbg import read_arcs, reverse_complement
+
+# k-mers are routed to one of this many partition files by their minimizer
+N_PARTITIONS = 256
+MINIMIZER_LEN = 11
+MASK64 = (1 << 64) - 1
+# rough cost of one k-mer while its bucket is built (Node, edge sets, dict
+# slots), and of one buffered record before it is written out
+BYTES_PER_KMER = 700
+BYTES_PER_RECORD = 200
+
+
+def _mix(code):
+    return code * 0x9E3779B97F4A7C15 & MASK64
+
+
+def read_partitions(read, k, packed, m=MINIMIZER_LEN):
+    # k-mer -> partition for every k-mer of read on both strands. The
+    # minimizer is the smallest m-mer under a 64-bit mix, so poly-A m-mers do
+    # not win everywhere; it depends on the k-mer alone, and neighbouring
+    # k-mers of a read mostly share it
+    m = min(m, k)
+    w, n = k - m + 1, len(read) - k
+    fwd_m, rc_m = kmers.pack_read(read, m)
+    # the reverse complement of the k-mer at i is made of rc_m[i: i + w]
+    fwd_m, rc_m = [_mix(code) for code in fwd_m], [_mix(code) for code in rc_m]
+    if packed:
+        fwd, rc = kmers.pack_read(read, k)
+    else:
+        rc_read = reverse_complement(read)
+        fwd = [read[i: i + k] for i in range(n + 1)]
+        rc = [rc_read[n - i: n - i + k] for i in range(n + 1)]
+    part_of = {fwd[i]: min(fwd_m[i: i + w]) % N_PARTITIONS for i in range(n + 1)}
+    part_of.update((rc[i], min(rc_m[i: i + w]) % N_PARTITIONS) for i in range(n + 1))
+    return part_of
+
+
+def _partition_path(tmp_dir, p):
+    return os.path.join(tmp_dir, 'part%d.pkl' % p)
+
+
+def _flush(tmp_dir, buffers, sizes):
+    for p, buffer in enumerate(buffers):
+        if buffer:
+            with open(_partition_path(tmp_dir, p), 'ab') as f:
+                pickle.dump(buffer, f, pickle.HIGHEST_PROTOCOL)
+            sizes[p] += len(buffer)
+            buffers[p] = []
+
+
+def partition(reads, k, packed, canonical, tmp_dir, budget):
+    # pass 1: send both ends of every arc to the partition of their k-mer's
+    # minimizer. A record (kmer, child, parent) counts the k-mer once, like
+    # one end of DBG._add_arc; canonical children are (kmer, strand, from strand)
+    flush_at = max(budget // 4 // BYTES_PER_RECORD, 1)
+    buffers = [[] for _ in range(N_PARTITIONS)]
+    sizes = [0] * N_PARTITIONS
+    buffered = 0
+    for original in reads:
+        part_of = read_partitions(original, k, packed)
+        for end1, end2 in read_arcs(original, k, packed, canonical):
+            if canonical:
+                (kmer1, strand1), (kmer2, strand2) = end1, end2
+                records = ((kmer1, (kmer2, strand2, strand1), None), (kmer2, (kmer1, 1 - strand1, 1 - strand2), None))
+            else:
+                records = ((end1, end2, None), (end2, None, end1))
+            for record in records:
+                buffers[part_of[record[0]]].append(record)
+            buffered += 2
+        if buffered >= flush_at:
+            _flush(tmp_dir, buffers, sizes)
+            buffered = 0
+    _flush(tmp_dir, buffers, sizes)
+    return sizes
+
+
+def group_partitions(sizes, budget):
+    # consecutive partitions that are built together as one bucket. Records
+    # bound the distinct k-mers from above, so a bucket stays within budget;
+    # a partition that alone exceeds it still gets a bucket of its own
+    groups, group, load = [], [], 0
+    for p, size in enumerate(sizes):
+        if not size:
+            continue
+        if group and load + size * BYTES_PER_KMER > budget:
+            groups.append(group)
+            group, load = [], 0
+        group.append(p)
+        load += size * BYTES_PER_KMER
+    if group:
+        groups.append(group)
+    return groups
+
+
+def iter_records(tmp_dir, group):
+    for p in group:
+        with open(_partition_path(tmp_dir, p), 'rb') as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    break
@@ -0,0 +1,46 @@
+BASES = 'ACGT'
+BASE2BIT = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+MAX_PACKED_K = 31
+# bytes.translate tables: ASCII base -> 2-bit code, and code -> code of the complement
+CODES = bytes.maketrans(BASES.encode(), bytes(range(4)))
+COMPLEMENT_CODES = bytes.maketrans(bytes(range(4)), bytes(range(3, -1, -1)))
+
+
+def encode(kmer):
+    code = 0
+    for base in kmer:
+        code = (code << 2) | BASE2BIT[base]
+    return code
+
+
+def decode(code, k):
+    bases = [''] * k
+    for i in range(k - 1, -1, -1):
+        bases[i] = BASES[code & 3]
+        code >>= 2
+    return ''.join(bases)
+
+
+def read_codes(read):
+    # the 2-bit code of every base of read, translated at C speed
+    codes = read.encode().translate(CODES)
+    if codes.translate(None, bytes(range(4))):
+        raise ValueError('non-ACGT base in read %s' % read)
+    return codes
+
+
+def pack_read(read, k):
+    # 2-bit codes of every k-mer of read, rolled forward with shift/mask;
+    # rc[i] is the code of the reverse complement of the k-mer starting at i
+    mask = (1 << (2 * k)) - 1
+    shift = 2 * (k - 1)
+    fwd, rc = [], []
+    code, rc_code = 0, 0
+    for i, base in enumerate(read):
+        b = BASE2BIT[base]
+        code = ((code << 2) | b) & mask
+        rc_code = (rc_code >> 2) | ((3 - b) << shift)
+        if i >= k - 1:
+            fwd.append(code)
+            rc.append(rc_code)
+    return fwd, rc
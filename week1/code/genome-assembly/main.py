@@ -1,23 +1,102 @@
-from dbg import DBG
-from utils import read_data
+from dbg import BACKENDS, DBG
+from utils import n50, stream_data
+from scaffold import scaffold
+from telemetry import json_lines
+from sweep import parse_k_range, sweep
+import argparse
+import itertools
 import sys
 import os
 
-sys.setrecursionlimit(1_000_000)
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('data_dir')
+    parser.add_argument('-k', type=int, default=25, help='k-mer length')
+    parser.add_argument('--k-range', metavar='START:STOP[:STEP]',
+                        help='assemble once per k (or a comma list of k) and report N50 for each; '
+                             'with --workers N, N values of k are built at a time')
+    parser.add_argument('--backend', choices=sorted(BACKENDS),
+                        help='graph backend: str keys, packed ints, or packed ints frozen into CSR arrays')
+    parser.add_argument('--packed', action='store_true', help='2-bit packed int k-mers instead of str keys')
+    parser.add_argument('--canonical', action='store_true', help='one node per k-mer/reverse complement pair')
+    parser.add_argument('--workers', type=int, default=1, help='processes for sharded k-mer counting')
+    parser.add_argument('--compact', action='store_true', help='collapse non-branching chains into unitigs')
+    parser.add_argument('--incremental', action='store_true', help='reuse depths of vertices unaffected by deletion')
+    parser.add_argument('--prune', action='store_true', help='remove low-count k-mers, tips and bubbles before traversal')
+    parser.add_argument('--min-count', type=int, default=None,
+                        help='count threshold for --prune (default: first valley of the count histogram)')
+    parser.add_argument('--save', metavar='PATH', help='write the built graph to a snapshot file')
+    parser.add_argument('--load', metavar='PATH', help='reload a snapshot instead of building from reads')
+    parser.add_argument('--contigs', type=int, default=20, help='number of contigs to extract')
+    parser.add_argument('--rank', choices=('length', 'coverage'), default='length',
+                        help='pick contigs by path length, or by length x mean k-mer coverage')
+    parser.add_argument('--min-length', type=int, default=0, help='drop contigs shorter than this; stop once none can pass')
+    parser.add_argument('--min-coverage', type=float, default=0, help='drop contigs under this mean k-mer coverage')
+    parser.add_argument('--target-length', type=int, help='stop once the contigs add up to this many bases')
+    parser.add_argument('--max-mem', type=int, metavar='MB',
+                        help='count k-mers in on-disk minimizer buckets that fit in MB and stitch their unitigs')
+    parser.add_argument('--bloom', action='store_true', help='skip k-mers seen in only one read (Bloom filter pass)')
+    parser.add_argument('--scaffold', action='store_true',
+                        help='join contigs by short_1/short_2 read pairs into scaffold.fasta')
+    parser.add_argument('--telemetry', nargs='?', const='-', metavar='PATH',
+                        help='log build/traversal events as JSON lines to PATH, or stderr without one')
+    parser.add_argument('--csr', action='store_true',
+                        help='build the graph in flat arrays instead of Node objects (lower peak memory)')
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    argv = sys.argv
-    short1, short2, long1 = read_data(os.path.join('./', argv[1]))
+    args = parse_args()
+    if args.backend:
+        # a backend is a preset of the store flags below
+        for option in BACKENDS[args.backend]:
+            setattr(args, option, True)
+
+    if args.k_range:
+        data_list = stream_data(os.path.join('./', args.data_dir))
+        results = sweep(data_list, parse_k_range(args.k_range), os.path.join('./', args.data_dir),
+                        workers=args.workers, n_contigs=args.contigs, packed=args.packed,
+                        canonical=args.canonical, compact=args.compact, incremental=args.incremental,
+                        csr=args.csr, prune=args.prune, min_count=args.min_count, bloom=args.bloom,
+                        max_mem=args.max_mem)
+        print('k\tcontigs\ttotal\tN50')
+        for k, n_contigs, total, k_n50 in results:
+            print('%d\t%d\t%d\t%s' % (k, n_contigs, total, k_n50))
+        best = max(results, key=lambda result: result[3] or 0)
+        print('best k by N50:', best[0])
+        sys.exit(0)
 
-    k = 25
-    dbg = DBG(k=k, data_list=[short1, short2, long1])
+    k = args.k
+    if args.load:
+        dbg = DBG.load(args.load, incremental=args.incremental)
+    else:
+        data_list = stream_data(os.path.join('./', args.data_dir))
+        dbg = DBG(k=k, data_list=data_list, packed=args.packed, canonical=args.canonical,
+                  workers=args.workers, compact=args.compact, incremental=args.incremental, csr=args.csr,
+                  prune=args.prune, min_count=args.min_count, bloom=args.bloom, max_mem=args.max_mem,
+                  telemetry=json_lines(args.telemetry) if args.telemetry else None)
+    if args.save:
+        dbg.save(args.save)
     # dbg.show_count_distribution()
-    with open(os.path.join('./', argv[1], 'contig.fasta'), 'w') as f:
-        for i in range(20):
-            c = dbg.get_longest_contig()
-            if c is None:
-                break
+    contigs = []
+    with open(os.path.join('./', args.data_dir, 'contig.fasta'), 'w') as f:
+        found = dbg.iter_contigs(by_coverage=args.rank == 'coverage', min_length=args.min_length,
+                                 min_coverage=args.min_coverage, target_length=args.target_length)
+        for i, c in enumerate(itertools.islice(found, args.contigs)):
             print(i, len(c))
             f.write('>contig_%d\n' % i)
             f.write(c + '\n')
+            contigs.append(c)
+
+    if args.scaffold:
+        # mates are line for line the same records of the two short read files
+        mates = stream_data(os.path.join('./', args.data_dir), ("short_1.fasta", "short_2.fasta"))
+        if len(mates) == 2:
+            scaffolds = scaffold(contigs, zip(*mates), dbg.k)
+            print('scaffolds', len(scaffolds), 'N50', n50([len(s) for s in scaffolds]),
+                  'contig N50', n50([len(c) for c in contigs]))
+            with open(os.path.join('./', args.data_dir, 'scaffold.fasta'), 'w') as f:
+                for i, s in enumerate(scaffolds):
+                    f.write('>scaffold_%d\n' % i)
+                    f.write(s + '\n')
@@ -0,0 +1,201 @@
+import itertools
+import os
+import pickle
+import tempfile
+import zlib
+from array import array
+from multiprocessing import Pool
+
+from csr import CSRGraph, group_edges
+from dbg import read_arcs
+
+CHUNK_SIZE = 1000
+
+
+def _shard_of_code(kmer, n_shards):
+    return kmer % n_shards
+
+
+def _shard_of_str(kmer, n_shards):
+    # str hashes are salted per process, so shard str k-mers by crc32
+    return zlib.crc32(kmer.encode()) % n_shards
+
+
+def _path(tmp_dir, name, *ids):
+    return os.path.join(tmp_dir, '%s%s.pkl' % (name, '-'.join(map(str, ids))))
+
+
+def _dump(obj, path):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _take(path):
+    # load a file written by another stage and remove it
+    with open(path, 'rb') as f:
+        obj = pickle.load(f)
+    os.remove(path)
+    return obj
+
+
+def _count_chunk(args):
+    # map: count k-mers and collect out-edges for one chunk of reads, split by shard.
+    # entry = [count, first seen, children]; children is a dict to keep insertion order
+    tmp_dir, chunk_id, reads, k, packed, canonical, n_shards = args
+    shards = [{} for _ in range(n_shards)]
+    shard_of = _shard_of_code if packed else _shard_of_str
+    seen = chunk_id << 32
+    for original in reads:
+        for end1, end2 in read_arcs(original, k, packed, canonical):
+            if canonical:
+                (kmer1, strand1), (kmer2, strand2) = end1, end2
+                edges = ((kmer1, (kmer2, strand2, strand1)), (kmer2, (kmer1, 1 - strand1, 1 - strand2)))
+            else:
+                edges = ((end1, end2), (end2, None))
+            for kmer, child in edges:
+                shard = shards[shard_of(kmer, n_shards)]
+                entry = shard.get(kmer)
+                if entry is None:
+                    entry = shard[kmer] = [0, seen, {}]
+                entry[0] += 1
+                if child is not None:
+                    entry[2][child] = None
+                seen += 1
+    # partials go through files, not back through the parent process
+    for i, shard in enumerate(shards):
+        _dump(shard, _path(tmp_dir, 'partial', i, chunk_id))
+
+
+def _merge_shard(args):
+    # reduce: merge the partials of one shard and number its k-mers in the
+    # order they were first seen. Edges are filed by the shard of their target,
+    # whose worker alone can turn the target k-mer into an id. Returns the
+    # shard's k-mer and count columns and its number of edges into each shard
+    tmp_dir, shard, n_chunks, n_shards, packed, canonical = args
+    merged = {}
+    for chunk_id in range(n_chunks):
+        partial = _take(_path(tmp_dir, 'partial', shard, chunk_id))
+        if not merged:
+            merged = partial
+            continue
+        for kmer, entry in partial.items():
+            merged_entry = merged.get(kmer)
+            if merged_entry is None:
+                merged[kmer] = entry
+            else:
+                merged_entry[0] += entry[0]
+                merged_entry[2].update(entry[2])
+    shard_of = _shard_of_code if packed else _shard_of_str
+    entries = sorted(merged.items(), key=lambda item: item[1][1])
+    del merged
+    kmers = [kmer for kmer, _ in entries]
+    # per target shard: local source ids, target k-mers and, when canonical, strand bits
+    out = [(array('q'), [], array('b')) for _ in range(n_shards)]
+    for idx, (_, entry) in enumerate(entries):
+        for child in entry[2]:
+            target = child[0] if canonical else child
+            sources, targets, strands = out[shard_of(target, n_shards)]
+            sources.append(idx)
+            targets.append(target)
+            if canonical:
+                strands.append(child[1] << 1 | child[2])
+    counts = array('d', (entry[0] for _, entry in entries))
+    del entries
+    _dump(kmers, _path(tmp_dir, 'kmers', shard))
+    for target_shard, edges in enumerate(out):
+        _dump(edges, _path(tmp_dir, 'edges', shard, target_shard))
+    return array('Q', kmers) if packed else kmers, counts, [len(edges[0]) for edges in out]
+
+
+def _resolve_shard(args):
+    # turn the target k-mers of every edge into this shard into ids, filed by
+    # source shard for _link_shard; when not canonical the same edges give
+    # this shard's parent rows, at parent_base in the full parent column
+    tmp_dir, shard, n_shards, node_base, parent_base, canonical = args
+    base = node_base[shard]
+    index = {kmer: base + idx for idx, kmer in enumerate(_take(_path(tmp_dir, 'kmers', shard)))}
+    parents, children = array('q'), array('q')
+    for source_shard in range(n_shards):
+        sources, targets, strands = _take(_path(tmp_dir, 'edges', source_shard, shard))
+        if canonical:
+            resolved = array('q', (index[kmer] << 2 | bits for kmer, bits in zip(targets, strands)))
+        else:
+            resolved = array('q', (index[kmer] for kmer in targets))
+            parents.extend(source + node_base[source_shard] for source in sources)
+            children.extend(target - base for target in resolved)
+        _dump((sources, resolved), _path(tmp_dir, 'links', source_shard, shard))
+    if canonical:
+        return None
+    offsets, parent_targets = group_edges(children, parents, len(index))
+    return array('q', (offset + parent_base for offset in offsets[:-1])), parent_targets
+
+
+def _link_shard(args):
+    # the child rows of one shard, at child_base in the full target column
+    tmp_dir, shard, n_shards, n_nodes, child_base = args
+    sources, targets = array('q'), array('q')
+    for target_shard in range(n_shards):
+        shard_sources, shard_targets = _take(_path(tmp_dir, 'links', shard, target_shard))
+        sources.extend(shard_sources)
+        targets.extend(shard_targets)
+    offsets, targets = group_edges(sources, targets, n_nodes)
+    return array('q', (offset + child_base for offset in offsets[:-1])), targets
+
+
+def _bases(sizes):
+    # start of each part when parts of these sizes are laid end to end
+    return list(itertools.accumulate(sizes, initial=0))[:-1]
+
+
+def _join(rows):
+    # per-shard (offsets, targets) laid end to end into one CSR
+    offsets, targets = array('q'), array('q')
+    for shard_offsets, shard_targets in rows:
+        offsets.extend(shard_offsets)
+        targets.extend(shard_targets)
+    offsets.append(len(targets))
+    return offsets, targets
+
+
+def build_csr(reads, k, packed, canonical, workers, chunk_size=CHUNK_SIZE):
+    # the whole graph built in worker processes: count, merge, resolve and
+    # link run shard by shard, and the parent only lays the shards' columns
+    # end to end. Node ids run shard by shard, each shard in first-seen order
+    n_shards = workers
+    reads = iter(reads)
+    chunk_id = 0
+    with tempfile.TemporaryDirectory(prefix='dbg-') as tmp_dir, Pool(workers) as pool:
+        while True:
+            # one wave of chunks at a time keeps at most `workers` chunks of raw reads alive
+            tasks = []
+            for _ in range(workers):
+                chunk = list(itertools.islice(reads, chunk_size))
+                if not chunk:
+                    break
+                tasks.append((tmp_dir, chunk_id, chunk, k, packed, canonical, n_shards))
+                chunk_id += 1
+            if not tasks:
+                break
+            pool.map(_count_chunk, tasks)
+        merged = pool.map(_merge_shard, [(tmp_dir, shard, chunk_id, n_shards, packed, canonical)
+                                         for shard in range(n_shards)])
+        node_base = _bases(len(counts) for _, counts, _ in merged)
+        child_base = _bases(sum(n_edges) for _, _, n_edges in merged)
+        parent_base = _bases(sum(n_edges[shard] for _, _, n_edges in merged) for shard in range(n_shards))
+        parent_rows = pool.map(_resolve_shard, [(tmp_dir, shard, n_shards, node_base, parent_base[shard], canonical)
+                                                for shard in range(n_shards)])
+        child_rows = pool.map(_link_shard, [(tmp_dir, shard, n_shards, len(merged[shard][1]), child_base[shard])
+                                            for shard in range(n_shards)])
+    kmer, count = array('Q') if packed else [], array('d')
+    for shard_kmers, shard_counts, _ in merged:
+        kmer.extend(shard_kmers)
+        count.extend(shard_counts)
+    del merged
+    offsets, targets = _join(child_rows)
+    if canonical:
+        parent_offsets, parent_targets = array('q', bytes(8 * (len(count) + 1))), array('q')
+    else:
+        parent_offsets, parent_targets = _join(parent_rows)
+    return CSRGraph.from_columns(kmer, count, offsets, targets, parent_offsets, parent_targets,
+                                 2 if canonical else 0)
+
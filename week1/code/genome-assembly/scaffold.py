@@ -0,0 +1,123 @@
+from dbg import reverse_complement
+
+# read pairs needed before two contig ends are joined
+MIN_LINKS = 3
+
+
+class ContigIndex:
+    # unique k-mer -> (contig, strand, offset) over both strands of the
+    # contigs; k-mers found in more than one place map to nothing
+    def __init__(self, contigs, k):
+        self.k = k
+        self.contigs = contigs
+        # contigs that are not copies of an earlier one
+        self.primary = []
+        self._index = {}
+        for cid, contig in enumerate(contigs):
+            kmers = [contig[i: i + k] for i in range(len(contig) - k + 1)]
+            # the assembler emits both strands of a region, plus copies that
+            # differ by errors; a contig made mostly of known k-mers is one of those
+            if sum(kmer in self._index for kmer in kmers) * 2 > len(kmers):
+                continue
+            self.primary.append(cid)
+            for strand, seq in ((0, contig), (1, reverse_complement(contig))):
+                for i in range(len(seq) - k + 1):
+                    kmer = seq[i: i + k]
+                    self._index[kmer] = None if kmer in self._index else (cid, strand, i)
+
+    def map_read(self, read):
+        # (contig, strand, start): the read sits at start on that strand of the
+        # contig; seeds at the read start, middle and end, first unique hit wins
+        k = self.k
+        if len(read) < k:
+            return None
+        for i in (0, (len(read) - k) // 2, len(read) - k):
+            hit = self._index.get(read[i: i + k])
+            if hit is not None:
+                cid, strand, pos = hit
+                return cid, strand, pos - i
+        return None
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def _collect_links(index, pairs):
+    # mates face each other (forward-reverse library): read 1 runs along the
+    # fragment, read 2 along its reverse complement
+    fragments, links = [], {}
+    for read1, read2 in pairs:
+        hit1, hit2 = index.map_read(read1), index.map_read(read2)
+        if hit1 is None or hit2 is None:
+            continue
+        (cid1, strand1, pos1), (cid2, strand2, pos2) = hit1, hit2
+        if strand1 == strand2:
+            continue
+        len1, len2 = len(index.contigs[cid1]), len(index.contigs[cid2])
+        if cid1 == cid2:
+            # read 2 ends at len - pos2 on the strand read 1 is on
+            fragments.append(len2 - pos2 - pos1)
+            continue
+        # contig 1 in orientation strand1 is followed by contig 2 in orientation
+        # 1 - strand2; the fragment spans len1 - pos1 bases of the first,
+        # then the gap, then len2 - pos2 bases of the second
+        ends = ((cid1, 1 - strand1), (cid2, 1 - strand2))
+        links.setdefault(frozenset(ends), []).append((len1 - pos1) + (len2 - pos2))
+    return fragments, links
+
+
+def _join(left, right, gap, k):
+    # neighbouring DBG contigs usually overlap by k - 1 bases; otherwise pad
+    # with Ns for the estimated gap, at least one so the join stays visible
+    if gap <= 0:
+        for overlap in range(min(len(left), len(right), -gap + k + 50), k - 2, -1):
+            if left.endswith(right[:overlap]):
+                return left + right[overlap:]
+    return left + 'N' * max(gap, 1) + right
+
+
+def scaffold(contigs, pairs, k):
+    # join contigs whose ends are linked by read pairs; contig ends are
+    # (contig, 0) for the left end and (contig, 1) for the right end
+    index = ContigIndex(contigs, k)
+    fragments, links = _collect_links(index, pairs)
+    if len(fragments) < MIN_LINKS:
+        return [contigs[cid] for cid in index.primary]
+    fragment = _median(fragments)
+    # best-supported link per contig end, kept only where both ends agree
+    best = {}
+    for ends, spans in links.items():
+        if len(spans) < MIN_LINKS:
+            continue
+        for end in ends:
+            if end not in best or len(spans) > len(links[best[end]]):
+                best[end] = ends
+    partner = {}
+    for ends in set(best.values()):
+        end1, end2 = ends
+        if best.get(end1) == ends and best.get(end2) == ends and end1[0] != end2[0]:
+            partner[end1], partner[end2] = end2, end1
+
+    scaffolds, used = [], set()
+    # start at contig ends without a partner, then break whatever cycles remain
+    starts = [(cid, 0) for cid in index.primary if (cid, 0) not in partner] + \
+        [(cid, 1) for cid in index.primary if (cid, 1) not in partner] + [(cid, 0) for cid in index.primary]
+    for cid, side in starts:
+        if cid in used:
+            continue
+        # entering at the left end reads the contig forward, at the right end reversed
+        seq, gap = '', 0
+        while True:
+            used.add(cid)
+            contig = contigs[cid] if side == 0 else reverse_complement(contigs[cid])
+            seq = contig if not seq else _join(seq, contig, gap, k)
+            tail = (cid, 1 - side)
+            if tail not in partner or partner[tail][0] in used:
+                break
+            ends = frozenset((tail, partner[tail]))
+            gap = fragment - _median(links[ends])
+            cid, side = partner[tail]
+        scaffolds.append(seq)
+    return scaffolds
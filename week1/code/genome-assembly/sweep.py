@@ -0,0 +1,52 @@
+import os
+from multiprocessing import Pool
+
+from dbg import DBG
+from utils import n50
+
+# reads shared with the sweep workers, set once per process by _init
+_reads = None
+
+
+def _init(reads):
+    global _reads
+    _reads = reads
+
+
+def _assemble(args):
+    k, options, n_contigs, out_path = args
+    dbg = DBG(k=k, data_list=_reads, **options)
+    lengths = []
+    with open(out_path, 'w') as f:
+        for i in range(n_contigs):
+            c = dbg.get_longest_contig()
+            if c is None:
+                break
+            lengths.append(len(c))
+            f.write('>contig_%d\n' % i)
+            f.write(c + '\n')
+    return k, lengths
+
+
+def parse_k_range(text):
+    # START:STOP[:STEP] with STOP included, or a comma separated list
+    if ',' in text:
+        return [int(k) for k in text.split(',')]
+    parts = [int(part) for part in text.split(':')]
+    start, stop = parts[0], parts[1] if len(parts) > 1 else parts[0]
+    step = parts[2] if len(parts) > 2 else 2
+    return list(range(start, stop + 1, step))
+
+
+def sweep(data_list, k_values, out_dir, workers=1, n_contigs=20, **options):
+    # reads are parsed once here; worker processes get them at start-up
+    # instead of each one re-reading the FASTA files
+    reads = [list(data) for data in data_list]
+    tasks = [(k, options, n_contigs, os.path.join(out_dir, 'contig_k%d.fasta' % k)) for k in k_values]
+    if workers > 1:
+        with Pool(min(workers, len(tasks)), initializer=_init, initargs=(reads,)) as pool:
+            results = pool.map(_assemble, tasks)
+    else:
+        _init(reads)
+        results = [_assemble(task) for task in tasks]
+    return [(k, len(lengths), sum(lengths), n50(lengths)) for k, lengths in results]
@@ -0,0 +1,52 @@
+import json
+import os
+import resource
+import sys
+import time
+
+# DBG_TELEMETRY=1 (or stderr) logs events to stderr, any other value is a file to append to
+ENV_VAR = 'DBG_TELEMETRY'
+# reads between two build progress events
+PROGRESS_EVERY = 10_000
+
+
+def rss_kb():
+    # current resident set size; falls back to the peak where /proc is missing
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+class Telemetry:
+    # structured events for a DBG run, handed to a callback as dicts
+    def __init__(self, callback):
+        self._callback = callback
+        self._start = time.perf_counter()
+
+    def emit(self, event, **fields):
+        record = {'event': event, 'elapsed': round(time.perf_counter() - self._start, 3), 'rss_kb': rss_kb()}
+        record.update(fields)
+        self._callback(record)
+
+
+def json_lines(target):
+    # callback writing one JSON object per line to stderr ('-') or a file
+    if target == '-':
+        stream = sys.stderr
+    else:
+        stream = open(target, 'a')
+
+    def write(record):
+        stream.write(json.dumps(record) + '\n')
+        stream.flush()
+    return write
+
+
+def from_env():
+    value = os.environ.get(ENV_VAR)
+    if not value or value == '0':
+        return None
+    return Telemetry(json_lines('-' if value in ('1', 'stderr') else value))
@@ -0,0 +1,59 @@
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+from dbg import DBG, reverse_complement
+from utils import iter_reads, stream_data
+
+WEEK1 = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+
+def _random_sequence(length, seed):
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for _ in range(length))
+
+
+@pytest.mark.parametrize("csr", [False, True])
+def test_cycle_is_walked_once(csr):
+    # a circular genome: every k-mer sits on one cycle, so _get_depth has to
+    # settle the whole component instead of recursing around it forever
+    k = 9
+    genome = _random_sequence(60, seed=0)
+    circular = genome + genome[:30]
+    reads = [circular[i: i + 30] for i in range(0, len(genome) + 1, 5)]
+    contig = DBG(k, [reads], csr=csr).get_longest_contig()
+    assert len(contig) == len(genome) + k - 1
+    assert contig in genome + genome or reverse_complement(contig) in genome + genome
+
+
+@pytest.mark.parametrize("csr", [False, True])
+def test_tail_into_cycle(csr):
+    k = 9
+    genome = _random_sequence(60, seed=0)
+    tail = _random_sequence(20, seed=1)
+    circular = genome + genome[:30]
+    reads = [circular[i: i + 30] for i in range(0, len(genome) + 1, 5)] + [tail + genome[:20]]
+    contig = DBG(k, [reads], csr=csr).get_longest_contig()
+    assert contig.startswith(tail)
+    assert len(contig) == len(tail) + len(genome) + k - 1
+
+
+@pytest.mark.parametrize("csr", [False, True])
+def test_long_chain_at_default_recursion_limit(csr):
+    # one read gives a chain of ~5000 k-mers, far deeper than the default limit
+    genome = _random_sequence(5000, seed=2)
+    assert sys.getrecursionlimit() < len(genome)
+    contig = DBG(25, [[genome]], csr=csr).get_longest_contig()
+    # read_arcs leaves out the last k-mer of a read
+    assert contig in (genome[:-1], reverse_complement(genome)[:-1])
+
+
+@pytest.mark.parametrize("options", [{}, {'packed': True, 'csr': True, 'incremental': True}])
+def test_data1_contigs(options):
+    # the contigs evaluate.sh expects for data1 with the default k=25 and 20 contigs
+    expected = list(iter_reads(os.path.join(WEEK1, 'test', 'data1', 'contig_py.fasta')))
+    dbg = DBG(25, stream_data(os.path.join(WEEK1, 'data', 'data1')), **options)
+    assert list(itertools.islice(dbg.iter_contigs(), len(expected))) == expected
@@ -1,13 +1,84 @@
+import gzip
+import itertools
 import os
 
+FASTQ_SUFFIXES = ('.fastq', '.fq', '.fastq.gz', '.fq.gz')
 
-def read_fasta(path, name):
-    data = []
-    with open(os.path.join(path, name), 'r') as f:
-        for line in f.readlines():
+
+def _open(file_path):
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, 'rt')
+    return open(file_path, 'r')
+
+
+def _iter_fasta(lines):
+    name, seq = None, []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == '>':
+            if name is not None:
+                yield name, ''.join(seq)
+            name, seq = line[1:], []
+        else:
+            seq.append(line)
+    if name is not None:
+        yield name, ''.join(seq)
+
+
+def _iter_fastq(lines, file_path):
+    for header in lines:
+        header = header.strip()
+        if not header:
+            continue
+        seq = []
+        for line in lines:
             line = line.strip()
-            if line[0] != '>':
-                data.append(line)
+            if line.startswith('+'):
+                break
+            seq.append(line)
+        seq = ''.join(seq)
+        # quality lines can start with '@' or '+', so consume them by length
+        qual = 0
+        try:
+            while qual < len(seq):
+                qual += len(next(lines).strip())
+        except StopIteration:
+            raise ValueError('truncated FASTQ record %s in %s' % (header[1:], file_path)) from None
+        yield header[1:], seq
+
+
+def iter_records(file_path):
+    # (name, sequence) pairs from multi-line FASTA or FASTQ, plain or gzipped
+    with _open(file_path) as f:
+        lines = iter(f)
+        for first in lines:
+            if first.strip():
+                break
+        else:
+            return
+        lines = itertools.chain([first], lines)
+        if first[0] == '@' or file_path.endswith(FASTQ_SUFFIXES):
+            yield from _iter_fastq(lines, file_path)
+        else:
+            yield from _iter_fasta(lines)
+
+
+def iter_reads(file_path):
+    for _, seq in iter_records(file_path):
+        yield seq
+
+
+def find_file(path, name):
+    for candidate in (name, name + '.gz'):
+        if os.path.exists(os.path.join(path, candidate)):
+            return os.path.join(path, candidate)
+    return None
+
+
+def read_fasta(path, name):
+    data = list(iter_reads(os.path.join(path, name)))
     print(name, len(data), len(data[0]))
     # print('Sample:', data[0])
     return data
@@ -18,3 +89,29 @@ def read_data(path):
     short2 = read_fasta(path, "short_2.fasta")
     long1 = read_fasta(path, "long.fasta")
     return short1, short2, long1
+
+
+def stream_data(path, names=("short_1.fasta", "short_2.fasta", "long.fasta")):
+    # lazy counterpart of read_data; inputs may be gzipped, missing ones are skipped
+    data_list = []
+    for name in names:
+        file_path = find_file(path, name)
+        if file_path is None:
+            print(name, 'not found, skipped')
+            continue
+        data_list.append(iter_reads(file_path))
+    return data_list
+
+
+def n50(lengths):
+    # length of the contig that takes the running total past half the assembly
+    half, total = sum(lengths) / 2, 0
+    for length in sorted(lengths, reverse=True):
+        total += length
+        if total >= half:
+            return length
+    return None
+
+
+def fasta_n50(file_path):
+    return n50([len(seq) for seq in iter_reads(file_path) if seq])
@@ -42,26 +42,14 @@ run_with_time(){ # $1=cmd $2=stdout $3=stderr
   rm -f "$t"
 }
 
-n50_of_fasta(){ python3 - "$1" <<'PY' 2>/dev/null || true
-import sys,re,os
+n50_of_fasta(){ python3 - "$1" "$PY_DIR" <<'PY' 2>/dev/null || true
+import sys,os
 p=sys.argv[1]
 if not os.path.isfile(p): print("NA"); raise SystemExit
-lens=[]; cur=None
-with open(p,'r',errors='ignore') as f:
-  for line in f:
-    s=line.strip()
-    if not s: continue
-    if s.startswith('>'):
-      if cur: lens.append(cur)
-      cur=0
-    else:
-      if re.fullmatch(r'[ACGTNacgtn]+', s): cur=(cur or 0)+len(s)
-if cur: lens.append(cur)
-if not lens: print("NA"); raise SystemExit
-lens.sort(reverse=True); tot=sum(lens); half=tot/2; acc=0
-for L in lens:
-  acc+=L
-  if acc>=half: print(L); break
+sys.path.insert(0, sys.argv[2])
+from utils import fasta_n50  # same N50 as main.py --k-range
+n50=fasta_n50(p)
+print(n50 if n50 is not None else "NA")
 PY
 }
 
@@ -180,4 +168,11 @@ for ds in "${DATASETS[@]}"; do
   printf '%s\t%s\t\t%s\t%s\n' "$ds" "codon"  "${co_rt:-"-"}" "${co_n50:-"NA"}"
 done
 
+### ── Per-phase benchmark (optional) ─────────────────────────────────────────────
+# BENCH_OUT=bench.json also records parse/build/contig times and peak RSS per
+# run as JSON; compare two of them with benchmark.py --compare
+if [ -n "${BENCH_OUT:-}" ]; then
+  python3 "$PY_DIR/benchmark.py" --data-base "$DATA_BASE" --datasets "${DATASETS[@]}" --out "$BENCH_OUT" || true
+fi
+
 exit 0
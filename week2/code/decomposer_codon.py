@@ -5,11 +5,18 @@ from utils_codon import is_valid_sequence
 
 DP_MODULE = "DP"
 
+# Backpointer codes of the DP cells; a jump from the end of motif pm is BT_JUMP + pm
+BT_START = 0
+BT_DIAG = 1
+BT_UP = 2
+BT_LEFT = 3
+BT_JUMP = 4
+
 class Decomposer:
 
     def __init__(self, mode=DP_MODULE):
         if mode not in ("DP",):
-            # Only DP is supported in Codon-friendly port
+            # Only DP is supported in Codon-friendly port; DP_NUMPY is in decomposer_numpy (CPython only)
             raise ValueError(f"{mode} is invalid mode for tandem repeat decomposer (Codon build supports DP only).")
         self.mode = "DP"
 
@@ -92,6 +99,15 @@ class Decomposer:
         if not is_valid_sequence(sequence):
             raise ValueError("Invalid character found in sequence")
 
+        return self._decompose(sequence, motifs, **kwargs)
+
+    def decompose_all(self, sequences, motifs, **kwargs):
+        # One decomposition per sequence, in input order; decomposer_pool.PoolDecomposer
+        # spreads them over processes under CPython
+        return [self.decompose(sequence, motifs, **kwargs) for sequence in sequences]
+
+    def _decompose(self, sequence, motifs, **kwargs):
+        # Mode dispatch on checked input; decomposer_numpy.Decomposer adds DP_NUMPY
         if self.mode == "DP":
             return self._decompose_dp(sequence, motifs, **kwargs)
         else:
@@ -122,78 +138,114 @@ class Decomposer:
         Ls = [len(m) for m in motifs]
         maxL = max(Ls)
 
-        # Create 3D tables using Python lists (Codon-friendly)
-        # s[i][m][j]: best score for seq[:i] vs motif m up to j
-        s = [[[float("-inf")] * (maxL + 1) for _ in range(M)] for _ in range(n + 1)]
-        bt = {}
+        # Flat tables (typed arrays in Codon): cell (i, m, j) sits at
+        # (i * M + m) * W + j. s holds the best score for seq[:i] vs motif m
+        # up to j, bt the move that reached it as a small int code
+        W = maxL + 1
+        row = M * W
+        s = [float("-inf")] * ((n + 1) * row)
+        bt = [BT_START] * ((n + 1) * row)
 
         # Initialize boundaries
-        for m, motif in enumerate(motifs):
-            s[0][m][0] = 0.0
-            bt[(0,m,0)] = (0,m,0)
+        for m in range(M):
+            s[m * W] = 0.0
             # leading gaps along motif (deletions in motif)
-            for j in range(1, len(motif) + 1):
-                s[0][m][j] = s[0][m][j-1] + insertion_score
-                bt[(0,m,j)] = (0,m,j-1)
+            for j in range(1, Ls[m] + 1):
+                s[m * W + j] = s[m * W + j - 1] + insertion_score
+                bt[m * W + j] = BT_LEFT
             # leading gaps along sequence (insertions in motif)
             for i in range(1, n + 1):
-                s[i][m][0] = s[i-1][m][0] + insertion_score
-                bt[(i,m,0)] = (i-1,m,0)
+                c = i * row + m * W
+                s[c] = s[c - row] + insertion_score
+                bt[c] = BT_UP
 
         # Fill DP
         for i in range(1, n + 1):
             a = sequence[i-1]
+            # best switch source in row i-1, picked like the scan over every
+            # motif end did: first maximum of end + sub. sub only depends on
+            # whether a matches the first base of the new motif, so two
+            # argmaxes per row cover every motif; end + sub rounds, so the
+            # argmax of end alone can pick a different motif
+            match_val = float("-inf")
+            match_m = -1
+            mismatch_val = float("-inf")
+            mismatch_m = -1
+            for pm in range(M):
+                end = s[(i - 1) * row + pm * W + Ls[pm]]
+                if end + match_score > match_val:
+                    match_val = end + match_score
+                    match_m = pm
+                if end + mismatch_score > mismatch_val:
+                    mismatch_val = end + mismatch_score
+                    mismatch_m = pm
             for m, motif in enumerate(motifs):
-                L = len(motif)
+                L = Ls[m]
+                c0 = i * row + m * W
                 for j in range(1, L + 1):
-                    b = motif[j-1]
+                    c = c0 + j
+                    sub = match_score if a == motif[j-1] else mismatch_score
                     # continue same motif: diag / up / left
-                    from_diag = s[i-1][m][j-1] + (match_score if a == b else mismatch_score)
-                    from_up   = s[i-1][m][j]   + insertion_score
-                    from_left = s[i][m][j-1]   + insertion_score
-
-                    best_score = from_diag
-                    best_ptr = (i-1, m, j-1)
+                    best_score = s[c - row - 1] + sub
+                    best_ptr = BT_DIAG
+                    from_up = s[c - row] + insertion_score
                     if from_up > best_score:
-                        best_score, best_ptr = from_up, (i-1, m, j)
+                        best_score, best_ptr = from_up, BT_UP
+                    from_left = s[c - 1] + insertion_score
                     if from_left > best_score:
-                        best_score, best_ptr = from_left, (i, m, j-1)
-
-                    s[i][m][j] = best_score
-                    bt[(i,m,j)] = best_ptr
+                        best_score, best_ptr = from_left, BT_LEFT
 
                     # switching motifs when starting a motif (j==1)
                     if j == 1:
-                        for pm, prev_motif in enumerate(motifs):
-                            jump_src = (i-1, pm, len(prev_motif))
-                            jump_val = s[jump_src[0]][jump_src[1]][jump_src[2]] + (match_score if a == b else mismatch_score)
-                            if jump_val > s[i][m][j]:
-                                s[i][m][j] = jump_val
-                                bt[(i,m,j)] = jump_src
+                        if a == motif[0]:
+                            jump_val, jump_m = match_val, match_m
+                        else:
+                            jump_val, jump_m = mismatch_val, mismatch_m
+                        if jump_m >= 0 and jump_val > best_score:
+                            best_score, best_ptr = jump_val, BT_JUMP + jump_m
+
+                    s[c] = best_score
+                    bt[c] = best_ptr
 
         # pick best end across motifs
-        best_end = None
+        best_m = -1
         best_val = float("-inf")
-        for m, motif in enumerate(motifs):
-            val = s[n][m][len(motif)]
+        for m in range(M):
+            val = s[n * row + m * W + Ls[m]]
             if val > best_val:
                 best_val = val
-                best_end = (n, m, len(motif))
+                best_m = m
 
         if best_val < min_score_threshold:
             if verbose:
                 print("Best score below threshold:", best_val)
             return []
 
-        # Backtrack to recover motif tokens
+        return self._backtrack(motifs, bt, W, n, best_m)
+
+    @staticmethod
+    def _backtrack(motifs, bt, W, n, best_m):
+        """
+        Recover motif tokens from the flat backpointer table, starting at the end of best_m in row n.
+        """
+        Ls = [len(m) for m in motifs]
+        row = len(motifs) * W
         path = []
-        i, m, j = best_end
+        i, m, j = n, best_m, Ls[best_m]
         while True:
             path.append((i,m,j))
-            prev = bt[(i,m,j)]
-            if (i,m,j) == prev:
+            ptr = bt[i * row + m * W + j]
+            if ptr == BT_START:
                 break
-            i,m,j = prev
+            if ptr == BT_DIAG:
+                i, j = i - 1, j - 1
+            elif ptr == BT_UP:
+                i -= 1
+            elif ptr == BT_LEFT:
+                j -= 1
+            else:
+                i, m = i - 1, ptr - BT_JUMP
+                j = Ls[m]
         path.reverse()
 
         tokens: List[str] = []
@@ -0,0 +1,125 @@
+from typing import List
+
+import numpy as np
+
+from decomposer_codon import Decomposer as _Decomposer
+from decomposer_codon import DP_MODULE, BT_START, BT_DIAG, BT_UP, BT_LEFT, BT_JUMP
+
+# Same DP with each sequence row computed as array operations over all motifs.
+# NumPy is CPython only, so this mode lives outside the Codon build.
+DP_NUMPY = "DP_NUMPY"
+
+
+class Decomposer(_Decomposer):
+    """
+    Decomposer with the DP_NUMPY mode on top of the Codon-compatible DP.
+    """
+
+    def __init__(self, mode=DP_MODULE):
+        if mode not in (DP_MODULE, DP_NUMPY):
+            raise ValueError(f"{mode} is invalid mode for tandem repeat decomposer (DP or DP_NUMPY).")
+        self.mode = mode
+
+    def _decompose(self, sequence, motifs, **kwargs):
+        if self.mode == DP_NUMPY:
+            return self._decompose_dp_numpy(sequence, motifs, **kwargs)
+        return super()._decompose(sequence, motifs, **kwargs)
+
+    def _decompose_dp_numpy(self, sequence: str, motifs: List[str], **kwargs) -> List[str]:
+        """
+        _decompose_dp with each sequence row computed for all motifs at once.
+        Motifs are padded into an (M, maxL + 1) matrix; diagonal and up moves
+        are taken in bulk, then left moves along the row. Backpointers and
+        tokens match _decompose_dp for any float scores.
+        """
+        params = self._check_if_dp_parameters_are_valid(kwargs)
+        match_score = params["match_score"]
+        mismatch_score = params["mismatch_score"]
+        insertion_score = params["insertion_score"]
+        min_score_threshold = params["min_score_threshold"]
+        verbose = params["verbose"]
+
+        n = len(sequence)
+        M = len(motifs)
+        Ls = np.array([len(m) for m in motifs])
+        W = int(Ls.max()) + 1
+        motif_ids = np.arange(M)
+        # column j of a row holds motif position j; columns past a motif's end stay -inf
+        valid = np.arange(W)[None, :] <= Ls[:, None]
+        invalid = ~valid
+        # leading gaps of row 0, summed one step at a time like the scalar DP
+        gaps = np.concatenate(([0.0], np.cumsum(np.full(W - 1, insertion_score))))
+        # with integer scores every sum is exact and the left moves of a row
+        # are one running max; other floats round differently when a gap run
+        # is summed at once, so those rows are relaxed step by step instead
+        exact = all(float(score).is_integer() for score in (match_score, mismatch_score, insertion_score))
+        # a left move into column j >= 2; none into the padding
+        left_step = np.where(valid[:, 2:], insertion_score, float("-inf"))
+        codes = np.zeros((M, W), dtype=np.uint8)
+        for m, motif in enumerate(motifs):
+            codes[m, 1:len(motif) + 1] = np.frombuffer(motif.encode(), dtype=np.uint8)
+        sub = {a: np.where(codes == ord(a), match_score, mismatch_score).astype(float) for a in set(sequence)}
+        first = {a: codes[:, 1] == ord(a) for a in set(sequence)}
+
+        bt = np.empty((n + 1, M, W), dtype=np.int32)
+        bt[0] = BT_LEFT
+        bt[:, :, 0] = BT_UP
+        bt[0, :, 0] = BT_START
+        prev = np.where(valid, gaps, float("-inf"))
+        for i in range(1, n + 1):
+            sub_i = sub[sequence[i-1]]
+            ptr = bt[i]
+            # first best switch source for a motif whose first base matches a,
+            # and for one whose first base does not, as in _decompose_dp
+            ends = prev[motif_ids, Ls]
+            match_m = int(np.argmax(ends + match_score))
+            mismatch_m = int(np.argmax(ends + mismatch_score))
+            jump_m = np.where(first[sequence[i-1]], match_m, mismatch_m)
+
+            cur = np.empty((M, W))
+            cur[:, 0] = prev[:, 0] + insertion_score
+            # diag / up for every motif position; ties keep diag
+            diag = prev[:, :-1] + sub_i[:, 1:]
+            up = prev[:, 1:] + insertion_score
+            from_up = up > diag
+            best = np.where(from_up, up, diag)
+            ptr[:, 1:] = np.where(from_up, BT_UP, BT_DIAG)
+            # j == 1: left from column 0, then a switch from the best motif end of row i-1
+            left = cur[:, 0] + insertion_score
+            from_left = left > best[:, 0]
+            best[from_left, 0] = left[from_left]
+            ptr[from_left, 1] = BT_LEFT
+            jump = ends[jump_m] + sub_i[:, 1]
+            from_jump = jump > best[:, 0]
+            best[from_jump, 0] = jump[from_jump]
+            ptr[from_jump, 1] = BT_JUMP + jump_m[from_jump]
+            # j >= 2: s[j] = max(best[j], s[j-1] + insertion)
+            s = cur[:, 1:]
+            if exact:
+                # the running max of best[t] - t * insertion shifted back by j * insertion
+                s[:] = np.maximum.accumulate(best - gaps[1:], axis=1) + gaps[1:]
+            else:
+                # each pass extends every left run by one column, adding the
+                # penalty once per step as the scalar DP does, until none grows
+                s[:] = best
+                while True:
+                    left = s[:, :-1] + left_step
+                    from_left = left > s[:, 1:]
+                    if not from_left.any():
+                        break
+                    s[:, 1:][from_left] = left[from_left]
+            ptr[:, 2:][s[:, :-1] + left_step > best[:, 1:]] = BT_LEFT
+            cur[invalid] = float("-inf")
+            prev = cur
+
+        # pick best end across motifs; the first one wins ties
+        ends = prev[motif_ids, Ls]
+        best_m = int(np.argmax(ends))
+        best_val = float(ends[best_m])
+
+        if best_val < min_score_threshold:
+            if verbose:
+                print("Best score below threshold:", best_val)
+            return []
+
+        return self._backtrack(motifs, bt.ravel(), W, n, best_m)
@@ -0,0 +1,44 @@
+from multiprocessing import Pool
+from typing import List
+
+from decomposer_codon import Decomposer
+
+# Process-pool fan-out for TandemRepeatVizWorker(decomposer=PoolDecomposer(...)).
+# Codon resolves multiprocessing at compile time, so this lives outside the Codon build.
+# Several chunks per worker even out alleles of very different length.
+CHUNKS_PER_WORKER = 4
+
+
+def _decompose_chunk(args):
+    # worker side: decompose one chunk of sequences with a pickled copy of the
+    # wrapped decomposer, so decomposer_numpy's DP_NUMPY mode runs here too
+    decomposer, sequences, motifs, kwargs = args
+    return [decomposer.decompose(seq, motifs, **kwargs) for seq in sequences]
+
+
+class PoolDecomposer:
+    """
+    Wraps a decomposer and runs decompose_all on a process pool of the given size.
+    """
+
+    def __init__(self, decomposer=None, workers: int = 1):
+        if decomposer is None:
+            decomposer = Decomposer()
+        self.decomposer = decomposer
+        self.workers = workers
+
+    def decompose(self, sequence: str, motifs: List[str], **kwargs) -> List[str]:
+        return self.decomposer.decompose(sequence, motifs, **kwargs)
+
+    def refine(self, decomposed_trs: List[List[str]], verbose: bool = False) -> List[List[str]]:
+        return self.decomposer.refine(decomposed_trs, verbose)
+
+    def decompose_all(self, sequences: List[str], motifs: List[str], **kwargs) -> List[List[str]]:
+        # Each sequence is decomposed independently; map returns the chunks in input order
+        if self.workers <= 1 or len(sequences) < 2:
+            return self.decomposer.decompose_all(sequences, motifs, **kwargs)
+        size = -(-len(sequences) // (self.workers * CHUNKS_PER_WORKER))
+        chunks = [sequences[i:i + size] for i in range(0, len(sequences), size)]
+        with Pool(self.workers) as pool:
+            results = pool.map(_decompose_chunk, [(self.decomposer, chunk, motifs, kwargs) for chunk in chunks])
+        return [tokens for chunk in results for tokens in chunk]
@@ -7,8 +7,12 @@ from motif_aligner_codon import MotifAligner
 from utils_codon import sort, add_padding, get_motif_marks
 
 class TandemRepeatVizWorker:
-    def __init__(self):
-        self.decomposer = Decomposer()
+    def __init__(self, decomposer=None):
+        # anything with decompose_all and refine: decomposer_numpy.Decomposer
+        # adds DP_NUMPY, decomposer_pool.PoolDecomposer a process pool (both CPython only)
+        if decomposer is None:
+            decomposer = Decomposer()
+        self.decomposer = decomposer
         self.motif_encoder = MotifEncoder()
         self.motif_aligner = MotifAligner()
 
@@ -26,15 +30,18 @@ class TandemRepeatVizWorker:
                         show_figure: bool=False,
                         output_name: str=None,
                         **kwargs):
-        # 1) decompose
-        decomposed = [self.decomposer.decompose(seq, motifs, **kwargs) for seq in tr_sequences]
+        # 1) decompose, once per distinct allele; refine and encode below count
+        # motif pairs and motifs over all samples, so they get every copy
+        alleles, allele_of = self._collapse(tr_sequences)
+        decomposed = self.decomposer.decompose_all(alleles, motifs, **kwargs)
+        decomposed = [decomposed[a] for a in allele_of]
         # 2) refine
         decomposed = self.decomposer.refine(decomposed)
         # 3) encode
         encoded_vntrs, symbol_to_motif, score_matrix, motif_counter = self.motif_encoder.encode(decomposed, score_matrix=None)
         # 4) align
         if not skip_alignment:
-            sample_ids, encoded_vntrs = self.motif_aligner.align(sample_ids, encoded_vntrs, tr_id, score_matrix, output_dir, tool='mafft')
+            sample_ids, encoded_vntrs = self._align_unique(sample_ids, encoded_vntrs, tr_id, score_matrix, output_dir)
         # padding
         encoded_vntrs = add_padding(encoded_vntrs, pad_left, pad_right)
         # 5) sort
@@ -42,6 +49,27 @@ class TandemRepeatVizWorker:
         # NOTE: Visualization is intentionally omitted in Codon build. Use Python visualizer on saved outputs.
         return sample_ids, encoded_vntrs, symbol_to_motif, score_matrix, motif_counter
 
+    @staticmethod
+    def _collapse(values: List[str]):
+        # distinct values in first-seen order, and for each value its index among them
+        index = {}
+        positions = [index.setdefault(v, len(index)) for v in values]
+        return list(index), positions
+
+    def _align_unique(self, sample_ids: List[str], encoded_vntrs: List[str], tr_id: str, score_matrix, output_dir: str):
+        # Align each distinct encoded allele once, under the first sample that
+        # carries it, then hand every sample the aligned row of its allele
+        rows, row_of = self._collapse(encoded_vntrs)
+        rep_ids = [None] * len(rows)
+        for sid, r in zip(sample_ids, row_of):
+            if rep_ids[r] is None:
+                rep_ids[r] = sid
+        aligned_ids, aligned = self.motif_aligner.align(rep_ids, rows, tr_id, score_matrix, output_dir, tool='mafft')
+        aligned_of = dict(zip(aligned_ids, aligned))
+        # the star fallback only returns some of its inputs
+        kept = [k for k in range(len(sample_ids)) if rep_ids[row_of[k]] in aligned_of]
+        return [sample_ids[k] for k in kept], [aligned_of[rep_ids[row_of[k]]] for k in kept]
+
 if __name__ == "__main__":
     # Tiny CLI for smoke test:
     # python main_codon.py ATG,TTG S1:S2:S3 ATGATGTTG:ATGATGATG:ATGTTGTTG
@@ -27,25 +27,25 @@ class MotifAligner:
     @staticmethod
     def _write_fasta(sample_ids: List[str], labeled_vntrs: List[str]) -> str:
         from tempfile import mkstemp
-        fd, path = mkstemp(prefix=\"trviz_\", suffix=\".fa\")
+        fd, path = mkstemp(prefix="trviz_", suffix=".fa")
         os.close(fd)
-        with open(path, \"w\") as f:
+        with open(path, "w") as f:
             for sid, lab in zip(sample_ids, labeled_vntrs):
-                f.write(f\">{sid}\\n{lab}\\n\")
+                f.write(f">{sid}\n{lab}\n")
         return path
 
     @staticmethod
     def _write_mafft_matrix(score_matrix: Dict) -> str:
         # Writes a MAFFT-compatible matrix for our alphabet (minus gaps). Gaps are set via flags.
         from tempfile import mkstemp
-        fd, path = mkstemp(prefix=\"trviz_\", suffix=\".mat\")
+        fd, path = mkstemp(prefix="trviz_", suffix=".mat")
         os.close(fd)
         symbols = [s for s in score_matrix.keys() if len(s)==1 and s.isprintable() and s not in ('gap_open','gap_extension')]
-        with open(path, \"w\") as f:
-            f.write(\"  \" + \" \".join(symbols) + \"\\n\")
+        with open(path, "w") as f:
+            f.write("  " + " ".join(symbols) + "\n")
             for s1 in symbols:
                 row = [s1] + [str(int(score_matrix[s1][s2])) for s2 in symbols]
-                f.write(\" \".join(row) + \"\\n\")
+                f.write(" ".join(row) + "\n")
         return path, symbols
 
     def _align_motifs_with_mafft(self, sample_ids, labeled_vntrs, vid, score_matrix, output_dir):
@@ -53,7 +53,7 @@ class MotifAligner:
         try:
             in_fa = self._write_fasta(sample_ids, labeled_vntrs)
             mat_path, symbols = self._write_mafft_matrix(score_matrix if score_matrix else {'?': {'?':2}})
-            cmd = [\"mafft\", \"--text\", \"--matrix\", mat_path, in_fa]
+            cmd = ["mafft", "--text", "--matrix", mat_path, in_fa]
             res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, text=True)
             if res.returncode != 0:
                 # fallback
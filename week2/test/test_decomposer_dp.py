@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "code"))
+
+from decomposer_codon import Decomposer  # noqa: E402
+
+# non-dyadic scores: sums round, so ties and maxima depend on the order moves are scored in
+FLOAT_SCORES = [(1.3, -0.7, -0.1), (0.1, -0.3, -0.2)]
+
+
+@pytest.fixture(scope="session")
+def tr_decomposer_dp():
+    return Decomposer(mode="DP")
+
+
+@pytest.mark.parametrize(
+    "sequence, motifs, scores, expected",
+    [
+        (
+                "TAGCCACTCGCCGCCTTTGAAAG",
+                ["TTGACT", "TTTGCC", "G"],
+                (1.3, -0.7, -0.1),
+                ["TTGACT", "TTGACT", "TTGACT", "TTTGCC", "TTTGCC", "G", "TTGACT", "TTGACT", "TTGACT", "TTGACT"]
+        ),
+        (
+                "TAGCCACTCGCCGCCTTTGAAAG",
+                ["TTGACT", "TTTGCC", "G"],
+                (0.1, -0.3, -0.2),
+                ["TTGACT", "TTGACT", "G", "TTGACT", "TTGACT", "TTGACT"]
+        ),
+        (
+                "AGCCATAA",
+                ["GAT", "CATGTG", "CGCCC"],
+                (1.3, -0.7, -0.1),
+                ["GAT", "GAT", "GAT", "CGCCC", "CGCCC", "CATGTG", "CATGTG", "GAT"]
+        ),
+        (
+                "GTCACATTATCGCCCAGTGGGCC",
+                ["CCGTAC", "TCA"],
+                (0.1, -0.3, -0.2),
+                ["TCA", "TCA", "CCGTAC", "CCGTAC"]
+        ),
+        (
+                "CGTACCGGGGCTCCGCCGCGGA",
+                ["G", "GACGT", "CTC"],
+                (0.1, -0.3, -0.2),
+                ["CTC", "CTC", "G", "CTC", "CTC", "G", "CTC", "CTC"]
+        ),
+    ]
+)
+def test_decompose_dp_float_scores(tr_decomposer_dp, sequence, motifs, scores, expected):
+    # expected tokens come from the original nested-list DP, which scanned every motif end on a switch
+    match_score, mismatch_score, insertion_score = scores
+    decomposed_tr = tr_decomposer_dp.decompose(sequence, motifs, match_score=match_score,
+                                               mismatch_score=mismatch_score, insertion_score=insertion_score)
+    assert decomposed_tr == expected
+
+
+@pytest.mark.parametrize("scores", FLOAT_SCORES + [(2.0, -1.0, -2.0)])
+def test_decompose_dp_numpy_matches_dp(tr_decomposer_dp, scores):
+    pytest.importorskip("numpy")
+    from decomposer_numpy import Decomposer as NumpyDecomposer
+
+    tr_decomposer_numpy = NumpyDecomposer(mode="DP_NUMPY")
+    match_score, mismatch_score, insertion_score = scores
+    rng = random.Random(0)
+    for _ in range(300):
+        sequence = "".join(rng.choice("ACGT") for _ in range(rng.randint(1, 30)))
+        motifs = ["".join(rng.choice("ACGT") for _ in range(rng.randint(1, 7))) for _ in range(rng.randint(1, 4))]
+        kwargs = dict(match_score=match_score, mismatch_score=mismatch_score, insertion_score=insertion_score)
+        assert tr_decomposer_numpy.decompose(sequence, motifs, **kwargs) == \
+            tr_decomposer_dp.decompose(sequence, motifs, **kwargs), (sequence, motifs)